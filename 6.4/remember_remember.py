@@ -1,5 +1,22 @@
+import argparse
+import fnmatch
+import os
+import random
+import sys
+import tempfile
+import timeit
+from collections import deque
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from typing import Union
+
 from PIL import Image
 
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
 
 def find_terrorist_code(path: str) -> str:
     """
@@ -15,6 +32,121 @@ def find_terrorist_code(path: str) -> str:
                     if code_image.getpixel((col, row)) == 1])
 
 
+def find_terrorist_code_vectorized(path: str) -> str:
+    """
+    Same as find_terrorist_code, but reads all of the image's pixels at once into numpy array instead of calling
+    getpixel for every pixel. Returns exactly the same string.
+    :param path: Path into the image.
+    :return: The encryption of the image.
+    :raises ImportError: If numpy is not installed.
+    """
+    if np is None:
+        raise ImportError("find_terrorist_code_vectorized requires numpy")
+    code_image = Image.open(path)
+    if code_image.mode == "1":
+        # getpixel returns 0/255 for black and white images, while numpy returns booleans.
+        code_image = code_image.convert("L")
+    pixels = np.asarray(code_image)
+    if pixels.ndim != 2:
+        # Pixels with some bands are tuples, so none of them equals 1.
+        return ""
+    # Transposed, so the pixels are scanned column after column, like at find_terrorist_code.
+    rows = np.nonzero(pixels.T == 1)[1]
+    if rows.size and rows.max() < 256:
+        return rows.astype(np.uint8).tobytes().decode("latin-1")
+    return "".join(map(chr, rows.tolist()))
+
+
+def benchmark_find_terrorist_code(sizes: tuple[tuple[int, int], ...] = ((64, 256), (256, 256), (1024, 256),
+                                                                       (1024, 1024)), repeat: int = 3) -> None:
+    """
+    Print how long find_terrorist_code and find_terrorist_code_vectorized take for random images of some sizes,
+    and check they return the same string.
+    :param sizes: (width, height) of the images to check.
+    :param repeat: How many times to run every decoder.
+    :return: None.
+    """
+    with tempfile.TemporaryDirectory() as images_directory:
+        for width, height in sizes:
+            path = os.path.join(images_directory, f"code_{width}x{height}.png")
+            code_image = Image.new("L", (width, height), 255)
+            for col in range(width):
+                code_image.putpixel((col, random.randrange(height)), 1)
+            code_image.save(path)
+
+            assert find_terrorist_code(path) == find_terrorist_code_vectorized(path)
+            loop_time = timeit.timeit(lambda: find_terrorist_code(path), number=repeat) / repeat
+            vectorized_time = timeit.timeit(lambda: find_terrorist_code_vectorized(path), number=repeat) / repeat
+            print(f"{width}x{height}: getpixel {loop_time * 1000:.2f}ms, vectorized {vectorized_time * 1000:.2f}ms")
+
+
+def iter_image_paths(directory: str, pattern: str = "*.png") -> Iterator[str]:
+    """
+    Returns the paths of the files inside the directory (not recursive) whose names match the pattern.
+    The directory is scanned lazily, so huge directories are not listed into memory.
+    :param directory: Path to the directory.
+    :param pattern: Shell-style pattern of the wanted files' names.
+    :return: Iterator of the images' paths.
+    """
+    with os.scandir(directory) as entries:
+        for entry in entries:
+            if entry.is_file() and fnmatch.fnmatch(entry.name, pattern):
+                yield entry.path
+
+
+def decode_images(paths: Iterable[str], processes: int = None, ordered: bool = True, max_in_flight: int = None,
+                  decoder: Callable[[str], str] = find_terrorist_code) -> Iterator[tuple[str, str]]:
+    """
+    Decodes many images at a process pool.
+    At most max_in_flight images are waiting at the pool at a time, so the paths are read only as fast as they
+    are decoded and memory stays flat.
+    :param paths: Paths to images (can be a generator).
+    :param processes: Number of processes, the default is the number of CPUs.
+    :param ordered: True to return the results by the paths' order, False to return each one when it is ready.
+    :param max_in_flight: How many images can wait at the pool at a time, the default is twice the processes.
+    :param decoder: Function that decodes one image (should be picklable).
+    :return: Iterator of (path, code) tuples.
+    """
+    processes = processes or os.cpu_count() or 1
+    max_in_flight = max_in_flight or processes * 2
+    paths = iter(paths)
+    with ProcessPoolExecutor(processes) as executor:
+        def submit_next() -> Union[tuple[str, Future], None]:
+            for path in paths:
+                return path, executor.submit(decoder, path)
+
+        if ordered:
+            in_flight = deque()
+            while len(in_flight) < max_in_flight and (submitted := submit_next()):
+                in_flight.append(submitted)
+            while in_flight:
+                path, future = in_flight.popleft()
+                yield path, future.result()
+                if submitted := submit_next():
+                    in_flight.append(submitted)
+        else:
+            in_flight = {}
+            while len(in_flight) < max_in_flight and (submitted := submit_next()):
+                in_flight[submitted[1]] = submitted[0]
+            while in_flight:
+                done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+                for future in done:
+                    yield in_flight.pop(future), future.result()
+                    if submitted := submit_next():
+                        in_flight[submitted[1]] = submitted[0]
+
+
+def decode_directory(directory: str, pattern: str = "*.png", **kwargs) -> Iterator[tuple[str, str]]:
+    """
+    Decodes all of the images inside the directory, see decode_images.
+    :param directory: Path to the directory.
+    :param pattern: Shell-style pattern of the images' names.
+    :param kwargs: decode_images's options.
+    :return: Iterator of (path, code) tuples.
+    """
+    return decode_images(iter_image_paths(directory, pattern), **kwargs)
+
+
 def main_remember() -> None:
     """
     Print the code after encrypted it.
@@ -23,5 +155,26 @@ def main_remember() -> None:
     print(find_terrorist_code("code.png"))
 
 
+def main_decode_directory(arguments: list[str] = None) -> None:
+    """
+    Command line entry point: print the code of every image inside a directory.
+    :param arguments: Command line arguments (the default is sys.argv).
+    :return: None.
+    """
+    parser = argparse.ArgumentParser(description="Decode all of the code images inside a directory.")
+    parser.add_argument("directory", help="Directory of code images.")
+    parser.add_argument("--pattern", default="*.png", help="Pattern of the images' names (default: *.png).")
+    parser.add_argument("--processes", type=int, help="Number of processes (default: number of CPUs).")
+    parser.add_argument("--max-in-flight", type=int, help="How many images can wait to be decoded at a time.")
+    parser.add_argument("--unordered", action="store_true", help="Print every code as soon as it is ready.")
+    parsed = parser.parse_args(arguments)
+    for path, code in decode_directory(parsed.directory, parsed.pattern, processes=parsed.processes,
+                                       ordered=not parsed.unordered, max_in_flight=parsed.max_in_flight):
+        print(f"{path}: {code}")
+
+
 if __name__ == "__main__":
-    main_remember()
+    if len(sys.argv) > 1:
+        main_decode_directory()
+    else:
+        main_remember()
@@ -1,9 +1,74 @@
-from collections import defaultdict
+import os
+import pickle
+import tempfile
+from collections import defaultdict, deque
 from collections.abc import Callable, Hashable
-from typing import Iterable
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Any, Iterable, Iterator, NamedTuple
 
 
-def group_by(function: Callable[..., Hashable], iterable: Iterable) -> dict:
+class Reducer(NamedTuple):
+    """ Tells group_by how to summarize the values of every key instead of keeping them.
+
+    :ivar initial: Function that returns the summary of a key before it has values.
+    :ivar add: Function that receives the current summary and new value, and returns the new summary.
+    """
+    initial: Callable[[], Any]
+    add: Callable[[Any, Any], Any]
+
+
+_NO_VALUE = object()
+# group_by_spilled's files that are still too big are not split again after that many levels.
+_MAX_SPILL_LEVELS = 8
+
+COUNT = Reducer(int, lambda total, item: total + 1)
+SUM = Reducer(int, lambda total, item: total + item)
+FIRST = Reducer(lambda: _NO_VALUE, lambda first, item: item if first is _NO_VALUE else first)
+
+
+def _apply_to_chunk(function: Callable[..., Hashable], chunk: list) -> list:
+    """ Returns the values the function returned for every item of the chunk (runs at the worker processes).
+
+    :param function: Any function that receives iterable argument and return an hashable.
+    :param chunk: List of items.
+    :return: List of the function's results.
+    """
+    return [function(item) for item in chunk]
+
+
+def _keyed(function: Callable[..., Hashable], iterable: Iterable, processes: int = None,
+           chunk_size: int = 1000) -> Iterator[tuple[Hashable, Any]]:
+    """ Returns (key, item) for every item of the iterable, by the iterable's order.
+
+    When processes is given, the function runs on chunks of items at a process pool. Only a few chunks are
+    sent to the pool at a time, so the iterable is not read into memory at once.
+
+    :param function: Any function that receives iterable argument and return an hashable (should be picklable
+                     when processes is given).
+    :param iterable: Any iterable.
+    :param processes: Optional, number of processes to run the function at.
+    :param chunk_size: Optional, how many items to send to a process at a time.
+    :return: Iterator of (key, item) tuples.
+    """
+    if not processes:
+        yield from ((function(item), item) for item in iterable)
+        return
+
+    iterator = iter(iterable)
+    with ProcessPoolExecutor(processes) as executor:
+        in_flight = deque()
+        while True:
+            while len(in_flight) < processes * 2 and (chunk := list(islice(iterator, chunk_size))):
+                in_flight.append((chunk, executor.submit(_apply_to_chunk, function, chunk)))
+            if not in_flight:
+                return
+            chunk, future = in_flight.popleft()
+            yield from zip(future.result(), chunk)
+
+
+def group_by(function: Callable[..., Hashable], iterable: Iterable, reducer: Reducer = None,
+             processes: int = None, chunk_size: int = 1000) -> dict:
     """
     Make a dictionary where the keys are the values returned from the function after activating
     the function on each of the values within the iterable.
@@ -13,20 +78,135 @@ def group_by(function: Callable[..., Hashable], iterable: Iterable) -> dict:
     https://stackoverflow.com/questions/46820714/how-to-create-a-list-of-values-in-a-dictionary-comprehension-in-python
     :param function: Any function that receives iterable argument and return an hashable.
     :param iterable: Any iterable
+    :param reducer: Optional, when given the value of each key is the reducer's summary of its values (for example
+                    COUNT, SUM, FIRST) and the values themselves are not kept.
+    :param processes: Optional, number of processes to run the function at (for expensive functions).
+    :param chunk_size: Optional, how many items to send to a process at a time.
     :return: Dictionary as described before.
     """
+    keyed = _keyed(function, iterable, processes, chunk_size)
+    if reducer is not None:
+        summaries = {}
+        for key, item in keyed:
+            summaries[key] = reducer.add(summaries[key] if key in summaries else reducer.initial(), item)
+        return summaries
+
     result_dict = defaultdict(list)
-    for item in iterable:
-        result_dict[function(item)].append(item)
+    for key, item in keyed:
+        result_dict[key].append(item)
     return dict(result_dict)
 
 
+def _read_partition(path: str) -> Iterator[tuple[Hashable, list]]:
+    """ Returns the (key, values) records of a partition file, by the order they were written.
+
+    :param path: The partition file's path.
+    :return: Iterator of (key, values) tuples (the same key may appear more than once).
+    """
+    with open(path, "rb") as partition_file:
+        while True:
+            try:
+                yield pickle.load(partition_file)
+            except EOFError:
+                return
+
+
+def _group_within_budget(groups: Iterable[tuple[Hashable, list]], memory_budget: int, partitions: int,
+                         spill_directory: str, level: int = 0) -> Iterator[tuple[Hashable, list]]:
+    """ Returns the groups of the (key, values) records, keeping at most memory_budget values in memory.
+
+    When there are more, the groups are written into partition files (every key always goes to the same file),
+    and every file is grouped the same way, so a file that is still too big is split again into files of the
+    next level (the keys are split by another hash at every level).
+
+    Note: The values of one key are always returned together, so a key with more values than memory_budget is
+          kept in memory whole.
+
+    :param groups: Iterable of (key, values) records, the values of every key by their order.
+    :param memory_budget: How many values to keep in memory before writing them into the files.
+    :param partitions: Number of files to split the groups between.
+    :param spill_directory: Directory to create the files in.
+    :param level: How many times the records were split before.
+    :return: Iterator of (key, values) tuples.
+    """
+    in_memory = defaultdict(list)
+    values_in_memory = 0
+    partition_paths = None
+    for key, values in groups:
+        in_memory[key].extend(values)
+        values_in_memory += len(values)
+        if values_in_memory >= memory_budget and len(in_memory) > 1 and level < _MAX_SPILL_LEVELS:
+            if partition_paths is None:
+                level_directory = tempfile.mkdtemp(dir=spill_directory)
+                partition_paths = [os.path.join(level_directory, f"partition_{i}") for i in range(partitions)]
+            _spill(in_memory, partition_paths, level)
+            values_in_memory = 0
+
+    if partition_paths is None:
+        yield from in_memory.items()
+        return
+    _spill(in_memory, partition_paths, level)
+
+    for path in partition_paths:
+        if os.path.exists(path):
+            yield from _group_within_budget(_read_partition(path), memory_budget, partitions, spill_directory,
+                                            level + 1)
+            os.remove(path)
+
+
+def _spill(in_memory: dict[Hashable, list], partition_paths: list[str], level: int) -> None:
+    """ Append the groups into the partition files by their keys' hash, and clear them.
+
+    :param in_memory: Key -> values.
+    :param partition_paths: The partition files' paths.
+    :param level: The level of the files (the keys are split by another hash at every level).
+    :return: None.
+    """
+    partition_files = [open(path, "ab") for path in partition_paths]
+    try:
+        for key, values in in_memory.items():
+            partition = hash((level, key)) % len(partition_paths)
+            pickle.dump((key, values), partition_files[partition], pickle.HIGHEST_PROTOCOL)
+    finally:
+        for partition_file in partition_files:
+            partition_file.close()
+    in_memory.clear()
+
+
+def group_by_spilled(function: Callable[..., Hashable], iterable: Iterable, memory_budget: int = 100000,
+                     partitions: int = 16, processes: int = None,
+                     chunk_size: int = 1000) -> Iterator[tuple[Hashable, list]]:
+    """ Same as group_by, but keeps at most memory_budget items in memory. When there are more, the groups are
+    written into temporary files (every key always goes to the same file), and at the end the files are read
+    one by one; a file with more than memory_budget items is split again into smaller files. Yields the groups
+    instead of returning dictionary, so only memory_budget items are in memory.
+
+    Note: The values of each key keep their order, but the keys are not yielded by the order they first appeared.
+          The values of one key are yielded together, so a key with more values than memory_budget is kept in
+          memory whole.
+
+    :param function: Any function that receives iterable argument and return an hashable (and picklable).
+    :param iterable: Any iterable of picklable items.
+    :param memory_budget: Optional, how many items to keep in memory before writing them into the files.
+    :param partitions: Optional, number of temporary files to split the groups between at every level.
+    :param processes: Optional, number of processes to run the function at (for expensive functions).
+    :param chunk_size: Optional, how many items to send to a process at a time.
+    :return: Iterator of (key, values) tuples.
+    """
+    groups = ((key, [item]) for key, item in _keyed(function, iterable, processes, chunk_size))
+    with tempfile.TemporaryDirectory() as spill_directory:
+        yield from _group_within_budget(groups, memory_budget, partitions, spill_directory)
+
+
 def main_group_by() -> None:
     """
     Print the dictionary that has been receives after using group_by function.
     :return: None
     """
     print(group_by(len, ["hi", "bye", "yo", "try"]))
+    print(group_by(len, ["hi", "bye", "yo", "try"], COUNT))
+    print(group_by(len, ["hi", "bye", "yo", "try"], FIRST, processes=2, chunk_size=1))
+    print(dict(group_by_spilled(len, ["hi", "bye", "yo", "try"], memory_budget=2)))
 
 
 if __name__ == "__main__":
@@ -1,4 +1,23 @@
-from typing import Type
+import asyncio
+import atexit
+import bisect
+import hashlib
+import mmap
+import multiprocessing
+import os
+import re
+import struct
+import tempfile
+import threading
+import time
+import timeit
+import tracemalloc
+from array import array
+from collections import defaultdict, deque
+from itertools import chain, count, islice
+from typing import Callable, Iterable, Iterator, Sequence, Type, Union
+
+_TOKEN_PATTERN = re.compile(r"\w+")
 
 
 class Message:
@@ -15,6 +34,7 @@ class Message:
     :param body: The body of the message.
     :param sender: The name of the person that sent the message.
     """
+    __slots__ = ("message_id", "title", "body", "sender", "is_read_before")
 
     def __init__(self, message_id: int, title: str, body: str, sender: str):
         self.message_id = message_id
@@ -47,18 +67,614 @@ class Message:
         return self.is_read_before
 
 
+class Inbox:
+    """ A user's box. Keeps urgent and normal messages in separate queues so sending is O(1), and remembers
+    up to where the normal messages were read so reading doesn't walk over them again.
+
+    Iterating the inbox gives the same order the old list had: urgent messages first (last sent first), then
+    the normal messages by sending order.
+
+    :ivar _urgent: Urgent messages, the last sent one is the first.
+    :ivar _normal: Normal messages by sending order.
+    :ivar _read_cursor: All of the normal messages before that index were read.
+    """
+
+    def __init__(self):
+        self._urgent = deque()
+        self._normal = []
+        self._read_cursor = 0
+
+    def __len__(self):
+        return len(self._urgent) + len(self._normal)
+
+    def __iter__(self) -> Iterator[Message]:
+        return chain(self._urgent, self._normal)
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Message, list[Message]]:
+        if isinstance(index, slice):
+            return list(self)[index]
+        if -len(self) <= index < 0:
+            index += len(self)
+        if 0 <= index < len(self._urgent):
+            return self._urgent[index]
+        return self._normal[index - len(self._urgent)]
+
+    def add(self, message: Message, urgent: bool = False) -> None:
+        """ Add message into the inbox.
+
+        :param message: The message to add.
+        :param urgent: True to put the message at the top of the inbox.
+        :return: None.
+        """
+        if urgent:
+            self._urgent.appendleft(message)
+        else:
+            self._normal.append(message)
+
+    def add_many(self, messages: list[Message], urgent: bool = False) -> None:
+        """ Add messages into the inbox, same as calling add on each of them by their order.
+
+        :param messages: The messages to add.
+        :param urgent: True to put the messages at the top of the inbox.
+        :return: None.
+        """
+        if urgent:
+            self._urgent.extendleft(messages)
+        else:
+            self._normal.extend(messages)
+
+    def entries(self) -> Iterator[tuple[Message, bool]]:
+        """ Returns (message, urgent) of every message, urgent messages first, each queue by arrival order.
+        Adding them by that order into empty inbox creates the same inbox.
+        """
+        return chain(((message, True) for message in reversed(self._urgent)),
+                     ((message, False) for message in self._normal))
+
+    def read(self, number_of_messages: int) -> list[Message]:
+        """ Mark the first number_of_messages messages as read and return the ones that weren't read before.
+
+        :param number_of_messages: How many messages from the top of the inbox to read.
+        :return: List of the messages that weren't read before.
+        """
+        unread = [message for message in islice(self._urgent, number_of_messages) if not message.is_read()]
+        normal_end = number_of_messages - len(self._urgent)
+        if normal_end > self._read_cursor:
+            unread.extend(message for message in self._normal[self._read_cursor:normal_end] if not message.is_read())
+            self._read_cursor = normal_end
+        for message in unread:
+            message.mark_as_read()
+        return unread
+
+
+class ColumnarInbox:
+    """ A user's box that keeps its messages' details in columns instead of Message objects, to save memory.
+    Ids, senders and read flags are kept in arrays (senders' names are kept once, by index), and Message
+    objects are created only when the messages are read/iterated.
+
+    Has the same interface and order as Inbox. Note: The returned messages are copies, so marking them as read
+    doesn't change the inbox, only reading through the inbox does.
+
+    :ivar _ids: Messages' ids by arrival order.
+    :ivar _titles: Messages' titles by arrival order.
+    :ivar _bodies: Messages' bodies by arrival order.
+    :ivar _senders: Index of every message's sender at _sender_names, by arrival order.
+    :ivar _read_flags: 1 for every message that was read, 0 otherwise, by arrival order.
+    :ivar _sender_names: The senders' names, every name appears once.
+    :ivar _sender_indexes: Sender's name -> its index at _sender_names.
+    :ivar _urgent_rows: Rows of the urgent messages by arrival order.
+    :ivar _normal_rows: Rows of the normal messages by arrival order.
+    :ivar _read_cursor: All of the normal messages before that index at _normal_rows were read.
+    """
+
+    def __init__(self):
+        self._ids = array("q")
+        self._titles = []
+        self._bodies = []
+        self._senders = array("I")
+        self._read_flags = bytearray()
+        self._sender_names = []
+        self._sender_indexes = {}
+        self._urgent_rows = array("q")
+        self._normal_rows = array("q")
+        self._read_cursor = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    def _rows(self) -> Iterator[int]:
+        """ Returns the rows of the messages by the inbox's order. """
+        return chain(reversed(self._urgent_rows), self._normal_rows)
+
+    def _message(self, row: int) -> Message:
+        """ Create Message object from the details at the wanted row.
+
+        :param row: The message's row.
+        :return: Message object.
+        """
+        message = Message(self._ids[row], self._titles[row], self._bodies[row],
+                          self._sender_names[self._senders[row]])
+        message.is_read_before = bool(self._read_flags[row])
+        return message
+
+    def __iter__(self) -> Iterator[Message]:
+        return (self._message(row) for row in self._rows())
+
+    def __getitem__(self, index: Union[int, slice]) -> Union[Message, list[Message]]:
+        if isinstance(index, slice):
+            return [self._message(row) for row in list(self._rows())[index]]
+        if -len(self) <= index < 0:
+            index += len(self)
+        if 0 <= index < len(self._urgent_rows):
+            return self._message(self._urgent_rows[len(self._urgent_rows) - 1 - index])
+        return self._message(self._normal_rows[index - len(self._urgent_rows)])
+
+    def add(self, message: Message, urgent: bool = False) -> None:
+        """ Add message into the inbox.
+
+        :param message: The message to add.
+        :param urgent: True to put the message at the top of the inbox.
+        :return: None.
+        """
+        if message.sender not in self._sender_indexes:
+            self._sender_indexes[message.sender] = len(self._sender_names)
+            self._sender_names.append(message.sender)
+        (self._urgent_rows if urgent else self._normal_rows).append(len(self._ids))
+        self._ids.append(message.message_id)
+        self._titles.append(message.title)
+        self._bodies.append(message.body)
+        self._senders.append(self._sender_indexes[message.sender])
+        self._read_flags.append(message.is_read())
+
+    def add_many(self, messages: list[Message], urgent: bool = False) -> None:
+        """ Add messages into the inbox, same as calling add on each of them by their order.
+
+        :param messages: The messages to add.
+        :param urgent: True to put the messages at the top of the inbox.
+        :return: None.
+        """
+        for message in messages:
+            self.add(message, urgent)
+
+    def entries(self) -> Iterator[tuple[Message, bool]]:
+        """ Returns (message, urgent) of every message, urgent messages first, each queue by arrival order.
+        Adding them by that order into empty inbox creates the same inbox.
+        """
+        return chain(((self._message(row), True) for row in self._urgent_rows),
+                     ((self._message(row), False) for row in self._normal_rows))
+
+    def read(self, number_of_messages: int) -> list[Message]:
+        """ Mark the first number_of_messages messages as read and return the ones that weren't read before.
+
+        :param number_of_messages: How many messages from the top of the inbox to read.
+        :return: List of the messages that weren't read before.
+        """
+        unread_rows = [row for row in islice(reversed(self._urgent_rows), number_of_messages)
+                       if not self._read_flags[row]]
+        normal_end = number_of_messages - len(self._urgent_rows)
+        if normal_end > self._read_cursor:
+            unread_rows.extend(row for row in self._normal_rows[self._read_cursor:normal_end]
+                               if not self._read_flags[row])
+            self._read_cursor = normal_end
+        for row in unread_rows:
+            self._read_flags[row] = 1
+        return [self._message(row) for row in unread_rows]
+
+
+class InboxIndex:
+    """ An inverted index over the messages of one box. Allows searching without scanning the whole box.
+
+    Substring searches use an n-gram index (every n-gram of the message's lowered body/title points to the
+    message), word searches use a token index. Candidates found by the n-gram index are verified against the
+    real text, so the results are exactly the same as Message.is_string_in_message returns.
+
+    :ivar _body_grams: n-gram of lowered body -> ids of the messages that include it.
+    :ivar _title_grams: n-gram of lowered title -> ids of the messages that include it.
+    :ivar _tokens: Lowered word -> ids of the messages that include it.
+    :ivar _messages: Message id -> (message, lowered body, lowered title).
+    :ivar _urgent_ids: Ids of the messages that sent as urgent (used to keep the box's order).
+    """
+    GRAM_LENGTH = 3
+
+    def __init__(self):
+        self._body_grams = defaultdict(set)
+        self._title_grams = defaultdict(set)
+        self._tokens = defaultdict(set)
+        self._messages = {}
+        self._urgent_ids = set()
+
+    def __len__(self):
+        return len(self._messages)
+
+    @classmethod
+    def _grams(cls, text: str) -> set[str]:
+        """ Returns all of the n-grams of the text.
+
+        :param text: Text to split.
+        :return: Set of the text's n-grams.
+        """
+        return {text[i:i + cls.GRAM_LENGTH] for i in range(len(text) - cls.GRAM_LENGTH + 1)}
+
+    def add(self, message: Message, urgent: bool = False) -> None:
+        """ Add message into the index.
+
+        :param message: The message to index.
+        :param urgent: True if the message sent as urgent one.
+        :return: None.
+        """
+        lower_body, lower_title = message.body.lower(), message.title.lower()
+        self._messages[message.message_id] = (message, lower_body, lower_title)
+        if urgent:
+            self._urgent_ids.add(message.message_id)
+        for gram in self._grams(lower_body):
+            self._body_grams[gram].add(message.message_id)
+        for gram in self._grams(lower_title):
+            self._title_grams[gram].add(message.message_id)
+        for token in _TOKEN_PATTERN.findall(lower_body) + _TOKEN_PATTERN.findall(lower_title):
+            self._tokens[token].add(message.message_id)
+
+    def _box_order(self, message_id: int) -> tuple[int, int]:
+        """ Returns sort key that places messages in the same order they appear inside the box:
+        urgent messages first (last sent first), then the other messages by sending order.
+
+        :param message_id: Id of indexed message.
+        :return: Sort key.
+        """
+        return (0, -message_id) if message_id in self._urgent_ids else (1, message_id)
+
+    def _candidates(self, grams_index: dict, string: str) -> set[int]:
+        """ Returns ids of the messages that include all of the string's n-grams.
+
+        :param grams_index: The n-grams index to look at.
+        :param string: String to search for.
+        :return: Set of the ids of the candidates.
+        """
+        grams = sorted(self._grams(string), key=lambda gram: len(grams_index.get(gram, ())))
+        if not grams:
+            return set(self._messages)
+        candidates = set(grams_index.get(grams[0], ()))
+        for gram in grams[1:]:
+            if not candidates:
+                break
+            candidates &= grams_index.get(gram, set())
+        return candidates
+
+    def search(self, string: str) -> list[Type[Message]]:
+        """ Returns the messages that include the string, same as Message.is_string_in_message does.
+
+        :param string: String to search for.
+        :return: List of the messages that including the string, at the box's order.
+        """
+        lower_string = string.lower()
+        found_ids = [message_id for message_id in self._candidates(self._body_grams, lower_string)
+                     if lower_string in self._messages[message_id][1]]
+        found_ids.extend(message_id for message_id in self._candidates(self._title_grams, string)
+                         if string in self._messages[message_id][2])
+        return [self._messages[message_id][0] for message_id in sorted(set(found_ids), key=self._box_order)]
+
+    def search_word(self, word: str) -> list[Type[Message]]:
+        """ Returns the messages that include the word as a whole word (case insensitive).
+
+        :param word: Word to search for.
+        :return: List of the messages that including the word, at the box's order.
+        """
+        found_ids = self._tokens.get(word.lower(), ())
+        return [self._messages[message_id][0] for message_id in sorted(found_ids, key=self._box_order)]
+
+
+class MessageLog:
+    """ An append-only log file that keeps post office's changes, so the post office can be loaded again after
+    restart. Every sent message and every read is written as a binary record.
+
+    Records are collected in memory and written together (group commit): the file is written and synced to
+    disk once sync_every records were collected, or once the oldest collected record waited sync_interval
+    seconds (a background thread writes them when no more records are added). The log is closed at exit if it
+    wasn't closed before.
+
+    :ivar path: Log file's path.
+    :ivar sync_every: How many records to collect before writing them.
+    :ivar sync_interval: Maximum seconds to keep records before writing them.
+    :ivar fsync: True to sync the file to disk after every write.
+    :ivar records_since_compaction: How many records were written since the log was compacted.
+    :ivar _pending: Records that weren't written yet.
+    :ivar _pending_records: How many records are at _pending.
+    :ivar _last_sync: Time of the last write.
+    :ivar _oldest_pending: Time the oldest pending record was added, None if there are no pending records.
+    :ivar _file: The open log file.
+    :ivar _lock: Guards the pending records (the log can be shared by many threads).
+    :ivar _closed: Set when the log is closed, stops the background thread.
+    :ivar _flusher: The background thread that writes records that waited sync_interval seconds.
+
+    :param path: Log file's path, created if it doesn't exist.
+    :param sync_every: Optional, how many records to collect before writing them.
+    :param sync_interval: Optional, maximum seconds to keep records before writing them.
+    :param fsync: Optional, False to let the operating system decide when to write to disk.
+    """
+    _SEND = 1
+    _READ = 2
+    _URGENT_FLAG = 1
+    _READ_FLAG = 2
+    # type, message id, flags, recipient length, sender length, title length, body length.
+    _SEND_HEADER = struct.Struct("<BqBIIII")
+    # type, number of messages, user's name length.
+    _READ_HEADER = struct.Struct("<BqI")
+
+    def __init__(self, path: str, sync_every: int = 100, sync_interval: float = 0.05, fsync: bool = True):
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.fsync = fsync
+        self.records_since_compaction = 0
+        self._pending = bytearray()
+        self._pending_records = 0
+        self._last_sync = time.monotonic()
+        self._oldest_pending = None
+        self._file = open(path, "ab")
+        self._lock = threading.Lock()
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(target=self._flush_periodically, name="message-log-flusher", daemon=True)
+        self._flusher.start()
+        atexit.register(self.close)
+
+    def _append(self, record: bytes) -> None:
+        """ Add record to the pending records, and write them if needed.
+
+        :param record: The record's bytes.
+        :return: None.
+        """
+        with self._lock:
+            if not self._pending:
+                self._oldest_pending = time.monotonic()
+            self._pending += record
+            self._pending_records += 1
+            self.records_since_compaction += 1
+            if self._pending_records >= self.sync_every or \
+                    time.monotonic() - self._last_sync >= self.sync_interval:
+                self._flush()
+
+    def _flush(self) -> None:
+        """ Write the pending records into the file (the lock should be taken).
+        :return: None.
+        """
+        if self._pending:
+            self._file.write(self._pending)
+            self._file.flush()
+            if self.fsync:
+                os.fsync(self._file.fileno())
+            self._pending.clear()
+            self._pending_records = 0
+        self._last_sync = time.monotonic()
+        self._oldest_pending = None
+
+    def _flush_periodically(self) -> None:
+        """ The background thread: write the pending records once the oldest of them waited sync_interval
+        seconds, until the log is closed.
+        :return: None.
+        """
+        timeout = self.sync_interval
+        while not self._closed.wait(timeout):
+            with self._lock:
+                waited = 0 if self._oldest_pending is None else time.monotonic() - self._oldest_pending
+                if self._oldest_pending is not None and waited >= self.sync_interval:
+                    self._flush()
+                    waited = 0
+            timeout = self.sync_interval - waited
+
+    def flush(self) -> None:
+        """ Write all of the pending records into the file.
+        :return: None.
+        """
+        with self._lock:
+            self._flush()
+
+    def close(self) -> None:
+        """ Write all of the pending records and close the file (does nothing if already closed).
+        :return: None.
+        """
+        if self._closed.is_set():
+            return
+        self._closed.set()
+        self._flusher.join()
+        atexit.unregister(self.close)
+        with self._lock:
+            self._flush()
+            self._file.close()
+
+    @classmethod
+    def _send_record(cls, recipient: str, message: Message, urgent: bool) -> bytes:
+        """ Returns the record of sent message.
+
+        :param recipient: The message recipient's username.
+        :param message: The sent message.
+        :param urgent: The urgency of the message.
+        :return: The record's bytes.
+        """
+        strings = [string.encode("utf-8") for string in (recipient, message.sender, message.title, message.body)]
+        flags = (cls._URGENT_FLAG if urgent else 0) | (cls._READ_FLAG if message.is_read() else 0)
+        return cls._SEND_HEADER.pack(cls._SEND, message.message_id, flags, *map(len, strings)) + b"".join(strings)
+
+    def log_send(self, recipient: str, message: Message, urgent: bool) -> None:
+        """ Write sent message into the log.
+
+        :param recipient: The message recipient's username.
+        :param message: The sent message.
+        :param urgent: The urgency of the message.
+        :return: None.
+        """
+        self._append(self._send_record(recipient, message, urgent))
+
+    def log_read(self, user_name: str, number_of_messages: int) -> None:
+        """ Write read of a box into the log.
+
+        :param user_name: The box's user.
+        :param number_of_messages: How many messages were read from the top of the box.
+        :return: None.
+        """
+        encoded_name = user_name.encode("utf-8")
+        self._append(self._READ_HEADER.pack(self._READ, number_of_messages, len(encoded_name)) + encoded_name)
+
+    def replay(self, post_office: 'PostOffice') -> None:
+        """ Apply all of the log's records on post office. The file is mapped into memory and read at once.
+        If the log ends with a record that was written partly (crash while writing), it is cut from the file.
+
+        :param post_office: The post office to load the records into (it shouldn't write into this log).
+        :return: None.
+        """
+        self.flush()
+        if os.path.getsize(self.path) == 0:
+            return
+        with open(self.path, "rb") as log_file, mmap.mmap(log_file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+            offset = self._replay_records(data, post_office)
+            size = len(data)
+        if offset < size:
+            with self._lock:
+                self._file.truncate(offset)
+
+    def _replay_records(self, data: mmap.mmap, post_office: 'PostOffice') -> int:
+        """ Apply the records on post office.
+
+        :param data: The log's content.
+        :param post_office: The post office to load the records into.
+        :return: Offset of the end of the last complete record.
+        """
+        offset, size = 0, len(data)
+        while offset < size:
+            if data[offset] == self._SEND and offset + self._SEND_HEADER.size <= size:
+                _, message_id, flags, *lengths = self._SEND_HEADER.unpack_from(data, offset)
+                end = offset + self._SEND_HEADER.size + sum(lengths)
+                if end > size:
+                    break
+                strings, position = [], offset + self._SEND_HEADER.size
+                for length in lengths:
+                    strings.append(data[position:position + length].decode("utf-8"))
+                    position += length
+                recipient, sender, title, body = strings
+                message = Message(message_id, title, body, sender)
+                message.is_read_before = bool(flags & self._READ_FLAG)
+                post_office.load_message(recipient, message, bool(flags & self._URGENT_FLAG))
+            elif data[offset] == self._READ and offset + self._READ_HEADER.size <= size:
+                _, number_of_messages, length = self._READ_HEADER.unpack_from(data, offset)
+                end = offset + self._READ_HEADER.size + length
+                if end > size:
+                    break
+                post_office.read_inbox(data[end - length:end].decode("utf-8"), number_of_messages)
+            else:
+                break
+            offset = end
+            self.records_since_compaction += 1
+        return offset
+
+    def compact(self, post_office: 'PostOffice') -> None:
+        """ Rewrite the log so it includes only one record for every message of the post office (with its
+        current read flag). The new log is written into temporary file and replaces the old one at once.
+
+        :param post_office: The post office that uses that log.
+        :return: None.
+        """
+        temporary_path = self.path + ".compact"
+        with self._lock:
+            self._flush()
+            with open(temporary_path, "wb") as compacted:
+                records = bytearray()
+                for user_name, box in post_office.boxes.items():
+                    for message, urgent in box.entries():
+                        records += self._send_record(user_name, message, urgent)
+                        if len(records) >= mmap.PAGESIZE * 16:
+                            compacted.write(records)
+                            records.clear()
+                compacted.write(records)
+                compacted.flush()
+                os.fsync(compacted.fileno())
+            self._file.close()
+            os.replace(temporary_path, self.path)
+            self._file = open(self.path, "ab")
+            self.records_since_compaction = 0
+
+
 class PostOffice:
     """A Post Office class. Allows users to message each other.
 
     :ivar int message_id: Incremental id of the last message sent.
     :ivar dict boxes: Users' inboxes.
+    :ivar dict indexes: Users' inboxes search indexes (empty when the post office is not indexed).
 
     :param list usernames: Users for which we should create PO Boxes.
+    :param bool indexed: Optional, True to keep search index for every box.
+    :param bool columnar: Optional, True to keep the boxes as ColumnarInbox (less memory, messages are created
+                          when read). Can't be used together with indexed.
+    :param MessageLog log: Optional, log to load the boxes from and to write every change into.
+    :param int compact_every: Optional, compact the log after that number of records were written into it.
+    :raises ValueError: If both indexed and columnar are True.
     """
+    SEND_MANY_CHUNK_SIZE = 10000
 
-    def __init__(self, usernames: list[str]):
+    def __init__(self, usernames: list[str], indexed: bool = False, columnar: bool = False,
+                 log: MessageLog = None, compact_every: int = 1000000):
+        self._check_options(indexed, columnar)
         self.message_id = 0
-        self.boxes = {user: [] for user in usernames}
+        self._inbox_type = ColumnarInbox if columnar else Inbox
+        self._indexed = indexed
+        self.boxes = {}
+        self.indexes = {}
+        for user in usernames:
+            self._add_box(user)
+        self.log = None
+        self.compact_every = compact_every
+        if log is not None:
+            log.replay(self)
+            self.log = log
+
+    @staticmethod
+    def _check_options(indexed: bool = False, columnar: bool = False, **other_options) -> None:
+        """ Check that the options can be used together. The index keeps its own Message objects, so with
+        ColumnarInbox it would return copies that reading doesn't mark, and would keep every message in memory
+        anyway.
+
+        :param indexed: The indexed option.
+        :param columnar: The columnar option.
+        :param other_options: The other options (not checked).
+        :return: None.
+        :raises ValueError: If both indexed and columnar are True.
+        """
+        if indexed and columnar:
+            raise ValueError("A post office can't be both indexed and columnar.")
+
+    def _add_box(self, user_name: str) -> None:
+        """ Create box (and index) for user.
+
+        :param user_name: The box's user.
+        :return: None.
+        """
+        self.boxes[user_name] = self._inbox_type()
+        if self._indexed:
+            self.indexes[user_name] = InboxIndex()
+
+    def load_message(self, recipient: str, message: Message, urgent: bool = False) -> None:
+        """ Put existing message into recipient's box (used when loading the post office from a log).
+        The box is created if the recipient doesn't exist.
+
+        :param recipient: The message recipient's username.
+        :param message: The message.
+        :param urgent: The urgency of the message.
+        :return: None.
+        """
+        if recipient not in self.boxes:
+            self._add_box(recipient)
+        self.message_id = max(self.message_id, message.message_id)
+        self._deliver(recipient, [message], urgent)
+
+    def compact_log(self) -> None:
+        """ Compact the post office's log, see MessageLog.compact.
+        :return: None.
+        """
+        if self.log is not None:
+            self.log.compact(self)
+
+    def _log_records_written(self) -> None:
+        """ Compact the log if too many records were written since the last compaction.
+        :return: None.
+        """
+        if self.log.records_since_compaction >= self.compact_every:
+            self.compact_log()
 
     def send_message(self, sender: str, recipient: str, title: str, message_body: str, urgent: bool = False) -> int:
         """Send a message to a recipient.
@@ -77,13 +693,85 @@ class PostOffice:
         :raises KeyError: if the recipient does not exist.
         """
         user_box = self.boxes[recipient]
-        self.message_id = self.message_id + 1
-        message_details = Message(self.message_id, title, message_body, sender)
-        if urgent:
-            user_box.insert(0, message_details)
-        else:
-            user_box.append(message_details)
-        return self.message_id
+        message_id = self._allocate_ids(1)[0]
+        message_details = Message(message_id, title, message_body, sender)
+        user_box.add(message_details, urgent)
+        if self.indexes:
+            self.indexes[recipient].add(message_details, urgent)
+        if self.log is not None:
+            self.log.log_send(recipient, message_details, urgent)
+            self._log_records_written()
+        return message_id
+
+    def _allocate_ids(self, number_of_ids: int) -> Sequence[int]:
+        """ Returns ids for new messages.
+
+        :param number_of_ids: How many ids to allocate.
+        :return: The new ids, by order.
+        """
+        first_id = self.message_id + 1
+        self.message_id += number_of_ids
+        return range(first_id, first_id + number_of_ids)
+
+    def send_many(self, messages: Iterable[tuple]) -> range:
+        """ Send many messages. Same as calling send_message for each of them by their order, but the
+        messages are handled in chunks: the recipients of every chunk are checked once, the chunk gets a
+        contiguous block of ids and every box gets its messages at once.
+
+        Note: The messages can be a generator, only one chunk is kept in memory at a time. If a chunk includes
+              recipient that doesn't exist, the chunks before it are already sent and none of its messages is.
+
+        :param messages: Iterable of (sender, recipient, title, message_body) or
+                         (sender, recipient, title, message_body, urgent) tuples.
+        :return: The ids of the sent messages.
+        :raises KeyError: if one of the recipients does not exist.
+        """
+        first_id = self.message_id + 1
+        messages = iter(messages)
+        while chunk := list(islice(messages, self.SEND_MANY_CHUNK_SIZE)):
+            self._send_chunk(chunk)
+        return range(first_id, self.message_id + 1)
+
+    def _send_chunk(self, chunk: list[tuple]) -> Sequence[int]:
+        """ Send chunk of messages, see send_many.
+
+        :param chunk: List of message tuples.
+        :return: The ids of the sent messages.
+        :raises KeyError: if one of the recipients does not exist.
+        """
+        for recipient in {details[1] for details in chunk}:
+            if recipient not in self.boxes:
+                raise KeyError(recipient)
+
+        message_ids = self._allocate_ids(len(chunk))
+        by_box = defaultdict(list)
+        for message_id, (sender, recipient, title, message_body, *urgent) in zip(message_ids, chunk):
+            message_details = Message(message_id, title, message_body, sender)
+            by_box[recipient, bool(urgent and urgent[0])].append(message_details)
+
+        for (recipient, urgent), box_messages in by_box.items():
+            self._deliver(recipient, box_messages, urgent, logged=True)
+        if self.log is not None:
+            self._log_records_written()
+        return message_ids
+
+    def _deliver(self, recipient: str, messages: list[Message], urgent: bool, logged: bool = False) -> None:
+        """ Add messages into recipient's box (and its index).
+
+        :param recipient: The messages recipient's username.
+        :param messages: The messages to add.
+        :param urgent: The urgency of the messages.
+        :param logged: Optional, True to write the messages into the log too (together with adding them, so the
+                       log has the same order as the box).
+        :return: None.
+        """
+        self.boxes[recipient].add_many(messages, urgent)
+        if self.indexes:
+            for message_details in messages:
+                self.indexes[recipient].add(message_details, urgent)
+        if logged and self.log is not None:
+            for message_details in messages:
+                self.log.log_send(recipient, message_details, urgent)
 
     def read_inbox(self, user_name: str, number_of_messages: int = None) -> list[Type[Message]]:
         """ Return list of the first number_of_messages messages of wanted user and mark them as read.
@@ -97,13 +785,27 @@ class PostOffice:
         if number_of_messages is None or not 0 <= number_of_messages <= len(self.boxes[user_name]):
             number_of_messages = len(self.boxes[user_name])
 
-        # Written like this because I wanted to mark all of the messages as read.
-        return_lst = []
-        for message in self.boxes[user_name][:number_of_messages]:
-            if not message.is_read():
-                message.mark_as_read()
-                return_lst.append(message)
-        return return_lst
+        read_messages = self.boxes[user_name].read(number_of_messages)
+        if read_messages and self.log is not None:
+            self.log.log_read(user_name, number_of_messages)
+            self._log_records_written()
+        return read_messages
+
+    def read_inboxes(self, user_names: Iterable[str], number_of_messages: int = None) -> dict[str, list[Message]]:
+        """ Read the inboxes of many users, same as calling read_inbox for each of them.
+
+        :param user_names: Wanted users' boxes (a name that appears more than once is read once).
+        :param number_of_messages: Optional, to read the first number of messages at every box.
+               Note: If the value is illegal for a box, all of its messages return.
+        :return: Dictionary of user's name -> list of wanted messages.
+        :raises KeyError: If one of the users' names doesn't exist (nothing is read in that case).
+        """
+        # A name that appears twice is read once (a second read would return nothing and hide the first).
+        user_names = list(dict.fromkeys(user_names))
+        for user_name in user_names:
+            if user_name not in self.boxes:
+                raise KeyError(user_name)
+        return {user_name: self.read_inbox(user_name, number_of_messages) for user_name in user_names}
 
     def search_inbox(self, user_name: str, string: str) -> list[Type[Message]]:
         """ Return all the messages inside user_name's box that include at their body the string.
@@ -113,8 +815,453 @@ class PostOffice:
         :return: List of the messages that including the string at their body.
         :raises KeyError: If user name doesn't exist.
         """
+        if self.indexes:
+            return self.indexes[user_name].search(string)
         return [message for message in self.boxes[user_name] if message.is_string_in_message(string)]
 
+    def search_inbox_by_word(self, user_name: str, word: str) -> list[Type[Message]]:
+        """ Return all the messages inside user_name's box that include the word as a whole word.
+
+        :param user_name: Wanted user_name's box to search in.
+        :param word: Word to search for (case insensitive).
+        :return: List of the messages that including the word.
+        :raises KeyError: If user name doesn't exist.
+        """
+        if self.indexes:
+            return self.indexes[user_name].search_word(word)
+        word = word.lower()
+        return [message for message in self.boxes[user_name]
+                if word in _TOKEN_PATTERN.findall(message.body.lower()) or
+                word in _TOKEN_PATTERN.findall(message.title.lower())]
+
+
+class ConcurrentPostOffice(PostOffice):
+    """ A Post Office that can be used from many threads at once. Inherits from PostOffice class.
+
+    Every box is guarded by one of a fixed number of locks (chosen by the user's name), so actions on unrelated
+    boxes usually don't wait for each other. Ids are taken from a shared itertools.count, taking the next value
+    is atomic so no lock is needed for it.
+
+    :ivar message_id: The last id that was taken (may be behind while other threads are sending).
+    :ivar _locks: The boxes' locks.
+    :ivar _compaction_lock: Allows only one thread to compact the log.
+    :ivar _id_counter: Gives the next message id.
+
+    :param list usernames: Users for which we should create PO Boxes.
+    :param int number_of_locks: Optional, how many locks to split the boxes between.
+    :param kwargs: Other PostOffice's options (indexed / columnar).
+    """
+
+    def __init__(self, usernames: list[str], number_of_locks: int = 64, **kwargs):
+        self._locks = [threading.Lock() for _ in range(number_of_locks)]
+        self._compaction_lock = threading.Lock()
+        super().__init__(usernames, **kwargs)
+        self._id_counter = count(self.message_id + 1)
+
+    def _lock_of(self, user_name: str) -> threading.Lock:
+        """ Returns the lock that guards user_name's box.
+
+        :param user_name: User's name.
+        :return: The box's lock.
+        """
+        return self._locks[hash(user_name) % len(self._locks)]
+
+    def _allocate_ids(self, number_of_ids: int) -> Sequence[int]:
+        """ Returns ids for new messages. The ids are unique but not necessarily contiguous.
+
+        :param number_of_ids: How many ids to allocate.
+        :return: The new ids, by order.
+        """
+        message_ids = [next(self._id_counter) for _ in range(number_of_ids)]
+        self.message_id = message_ids[-1]
+        return message_ids
+
+    def send_message(self, sender: str, recipient: str, title: str, message_body: str, urgent: bool = False) -> int:
+        with self._lock_of(recipient):
+            message_id = super().send_message(sender, recipient, title, message_body, urgent)
+        self._compact_log_if_needed()
+        return message_id
+
+    def _log_records_written(self) -> None:
+        """ Compaction needs all of the locks, so it is not done while holding a box's lock (see
+        _compact_log_if_needed).
+        :return: None.
+        """
+
+    def _compact_log_if_needed(self) -> None:
+        """ Compact the log if too many records were written since the last compaction. Should be called
+        without holding any box's lock.
+        :return: None.
+        """
+        if self.log is not None and self.log.records_since_compaction >= self.compact_every:
+            self.compact_log()
+
+    def compact_log(self) -> None:
+        """ Compact the post office's log while all of the boxes are locked, see MessageLog.compact.
+        :return: None.
+        """
+        with self._compaction_lock:
+            for lock in self._locks:
+                lock.acquire()
+            try:
+                super().compact_log()
+            finally:
+                for lock in self._locks:
+                    lock.release()
+
+    def send_many(self, messages: Iterable[tuple]) -> list[int]:
+        """ Send many messages, see PostOffice.send_many.
+
+        Note: Other threads may send messages in the meantime, so the returned ids are not contiguous.
+
+        :param messages: Iterable of (sender, recipient, title, message_body) or
+                         (sender, recipient, title, message_body, urgent) tuples.
+        :return: The ids of the sent messages.
+        :raises KeyError: if one of the recipients does not exist.
+        """
+        sent_ids = []
+        messages = iter(messages)
+        while chunk := list(islice(messages, self.SEND_MANY_CHUNK_SIZE)):
+            sent_ids.extend(self._send_chunk(chunk))
+            self._compact_log_if_needed()
+        return sent_ids
+
+    def _deliver(self, recipient: str, messages: list[Message], urgent: bool, logged: bool = False) -> None:
+        with self._lock_of(recipient):
+            super()._deliver(recipient, messages, urgent, logged)
+
+    def read_inbox(self, user_name: str, number_of_messages: int = None) -> list[Type[Message]]:
+        with self._lock_of(user_name):
+            read_messages = super().read_inbox(user_name, number_of_messages)
+        self._compact_log_if_needed()
+        return read_messages
+
+    def search_inbox(self, user_name: str, string: str) -> list[Type[Message]]:
+        with self._lock_of(user_name):
+            return super().search_inbox(user_name, string)
+
+    def search_inbox_by_word(self, user_name: str, word: str) -> list[Type[Message]]:
+        with self._lock_of(user_name):
+            return super().search_inbox_by_word(user_name, word)
+
+
+class AsyncPostOffice:
+    """ An asyncio front end for ConcurrentPostOffice. Every action runs in a worker thread so the event loop
+    isn't blocked while waiting for a box's lock.
+
+    :ivar post_office: The wrapped post office.
+
+    :param post_office: The post office to wrap.
+    """
+
+    def __init__(self, post_office: ConcurrentPostOffice):
+        self.post_office = post_office
+
+    async def send(self, sender: str, recipient: str, title: str, message_body: str, urgent: bool = False) -> int:
+        """ Send a message to a recipient, see PostOffice.send_message. """
+        return await asyncio.to_thread(self.post_office.send_message, sender, recipient, title, message_body, urgent)
+
+    async def read(self, user_name: str, number_of_messages: int = None) -> list[Type[Message]]:
+        """ Read user_name's box, see PostOffice.read_inbox. """
+        return await asyncio.to_thread(self.post_office.read_inbox, user_name, number_of_messages)
+
+    async def search(self, user_name: str, string: str) -> list[Type[Message]]:
+        """ Search in user_name's box, see PostOffice.search_inbox. """
+        return await asyncio.to_thread(self.post_office.search_inbox, user_name, string)
+
+
+class HashRing:
+    """ A consistent hash ring. Every node gets many points on the ring, and a key belongs to the first node's
+    point after the key's hash, so adding or removing a node moves only the keys of its own points.
+
+    The hash is md5 (and not hash()), so it is the same at every process and every run.
+
+    :ivar _points: Sorted hashes of the nodes' points.
+    :ivar _nodes: The node of every point, by the points' order.
+
+    :param nodes: The nodes.
+    :param virtual_nodes: Optional, number of points of every node (more points split the keys more evenly).
+    """
+
+    def __init__(self, nodes: Iterable, virtual_nodes: int = 64):
+        points = sorted((self._hash(f"{node}#{i}"), node) for node in nodes for i in range(virtual_nodes))
+        self._points = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        """ Returns the key's place on the ring. """
+        return int.from_bytes(hashlib.md5(key.encode("utf-8")).digest()[:8], "big")
+
+    def node_of(self, key: str):
+        """ Returns the node that key belongs to.
+
+        :param key: The key.
+        :return: The key's node.
+        """
+        return self._nodes[bisect.bisect(self._points, self._hash(key)) % len(self._nodes)]
+
+
+def _shard_worker(connection, usernames: list[str], options: dict) -> None:
+    """ Main loop of a ShardedPostOffice's worker process: keeps PostOffice with the shard's users, and runs the
+    batches of requests it gets from the connection until it gets None.
+
+    Every batch is a list of (method's name, arguments) tuples, and the reply is a list of (True, result) or
+    (False, raised exception) tuples by the same order. The "load_messages" request puts messages that already
+    have ids into the boxes.
+
+    :param connection: The shard's end of the pipe.
+    :param usernames: The shard's users.
+    :param options: PostOffice's options (indexed / columnar).
+    :return: None.
+    """
+    post_office = PostOffice(usernames, **options)
+
+    def load_messages(messages: list[tuple]) -> None:
+        for message_id, sender, recipient, title, message_body, urgent in messages:
+            post_office.load_message(recipient, Message(message_id, title, message_body, sender), urgent)
+
+    while (requests := connection.recv()) is not None:
+        replies = []
+        for method, arguments in requests:
+            try:
+                function = load_messages if method == "load_messages" else getattr(post_office, method)
+                replies.append((True, function(*arguments)))
+            except Exception as error:
+                replies.append((False, error))
+        connection.send(replies)
+    connection.close()
+
+
+class ShardedPostOffice:
+    """ A Post Office that keeps its boxes at worker processes, so the work isn't limited to one core. Has the
+    same actions as PostOffice.
+
+    Every user's box is at one shard (a worker process with its own PostOffice), chosen by a consistent hash of
+    the user's name. Every shard has its own range of ids, so ids are given here without asking the shards: the
+    id of a sent message is returned at once, and the message waits until a batch of batch_size messages for its
+    shard is ready (or until the shard is asked for something else) and then the whole batch is sent together.
+    Full batches are sent without waiting for the shard to load them, so the shards load while more messages are
+    sent. Reads and searches of a box always see the messages that were sent to it before.
+
+    Note: The ids are unique but only increasing within a shard. The boxes are at the workers, so there is no
+          boxes attribute, and the post office can't have a log. Call close (or use with) to stop the workers.
+
+    :ivar message_id: The last id that was given.
+    :ivar usernames: Users that have a box.
+    :ivar _ring: The hash ring that chooses the users' shards.
+    :ivar _shard_of_user: User's name -> the index of its shard.
+    :ivar _next_ids: Gives the next id of every shard.
+    :ivar _pending: Messages of every shard that were not sent to it yet.
+    :ivar _unanswered: Number of batches every shard was sent and didn't reply to yet.
+    :ivar _failures: Failed replies of every shard to batches it was sent without waiting, not raised yet.
+    :ivar _connections: The pipes to the workers.
+    :ivar _workers: The worker processes.
+
+    :param list usernames: Users for which we should create PO Boxes.
+    :param int shards: Optional, number of worker processes (the default is the number of CPUs).
+    :param int batch_size: Optional, how many messages of a shard to send to it at once.
+    :param kwargs: Other PostOffice's options (indexed / columnar).
+    :raises ValueError: If both indexed and columnar are True.
+    """
+    ID_RANGE_SIZE = 2 ** 48
+    MAX_UNANSWERED_BATCHES = 8
+
+    def __init__(self, usernames: list[str], shards: int = None, batch_size: int = 1000, **kwargs):
+        PostOffice._check_options(**kwargs)
+        shards = shards or os.cpu_count() or 1
+        self.message_id = 0
+        self.usernames = set(usernames)
+        self.batch_size = batch_size
+        self._ring = HashRing(range(shards))
+        self._shard_of_user = {user: self._ring.node_of(user) for user in self.usernames}
+        self._next_ids = [count(shard * self.ID_RANGE_SIZE + 1) for shard in range(shards)]
+        self._pending = [[] for _ in range(shards)]
+        self._unanswered = [0] * shards
+        self._failures = [[] for _ in range(shards)]
+        users_of_shard = [[] for _ in range(shards)]
+        for user, shard in self._shard_of_user.items():
+            users_of_shard[shard].append(user)
+
+        self._connections = []
+        self._workers = []
+        for shard_users in users_of_shard:
+            connection, worker_connection = multiprocessing.Pipe()
+            worker = multiprocessing.Process(target=_shard_worker, args=(worker_connection, shard_users, kwargs),
+                                             daemon=True)
+            worker.start()
+            worker_connection.close()
+            self._connections.append(connection)
+            self._workers.append(worker)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exception_details) -> None:
+        self.close()
+
+    def _shard_of(self, user_name: str) -> int:
+        """ Returns the index of user_name's shard.
+
+        :param user_name: User's name.
+        :return: The shard's index.
+        :raises KeyError: If user name doesn't exist.
+        """
+        return self._shard_of_user[user_name]
+
+    def _call_shards(self, requests_by_shard: dict[int, list[tuple]]) -> dict[int, list]:
+        """ Send batch of requests to every given shard, with the shard's pending messages before them, and
+        returns their results. All of the batches are sent before waiting, so the shards work at the same time.
+
+        :param requests_by_shard: Shard's index -> list of (method's name, arguments) tuples.
+        :return: Shard's index -> the results of its requests, by their order.
+        :raises Exception: The first exception that was raised at one of the shards.
+        """
+        for shard, requests in requests_by_shard.items():
+            if self._pending[shard]:
+                requests = [("load_messages", (self._pending[shard],))] + requests
+                self._pending[shard] = []
+            self._connections[shard].send(requests)
+
+        results, error = {}, None
+        for shard, requests in requests_by_shard.items():
+            replies = self._receive(shard)
+            for succeeded, result in replies:
+                if not succeeded and error is None:
+                    error = result
+            results[shard] = [result for _, result in replies[len(replies) - len(requests):]]
+        if error is not None:
+            raise error
+        return results
+
+    def _send_pending(self, shard: int) -> None:
+        """ Send shard's pending messages to it without waiting for its reply. If the shard has too many
+        unanswered batches, waits for the oldest one first (so the replies don't fill the pipe).
+
+        :param shard: The shard's index.
+        :return: None.
+        """
+        if self._unanswered[shard] >= self.MAX_UNANSWERED_BATCHES:
+            self._receive_unanswered(shard)
+        self._connections[shard].send([("load_messages", (self._pending[shard],))])
+        self._pending[shard] = []
+        self._unanswered[shard] += 1
+
+    def _receive_unanswered(self, shard: int) -> None:
+        """ Wait for the shard's reply to its oldest unanswered batch, and keep its failures.
+        :param shard: The shard's index.
+        :return: None.
+        """
+        self._failures[shard].extend(reply for reply in self._connections[shard].recv() if not reply[0])
+        self._unanswered[shard] -= 1
+
+    def _receive(self, shard: int) -> list[tuple]:
+        """ Wait for the shard's reply to the last batch, after the replies to the batches that were sent
+        without waiting.
+
+        :param shard: The shard's index.
+        :return: The reply to the last batch, after the failures of the batches that were sent without waiting.
+        """
+        while self._unanswered[shard]:
+            self._receive_unanswered(shard)
+        failures, self._failures[shard] = self._failures[shard], []
+        return failures + self._connections[shard].recv()
+
+    def flush(self) -> None:
+        """ Send the pending messages of every shard to it, and wait until all of the shards loaded them.
+        :return: None.
+        """
+        self._call_shards({shard: [] for shard, pending in enumerate(self._pending) if pending or
+                           self._unanswered[shard]})
+
+    def _queue(self, sender: str, recipient: str, title: str, message_body: str, urgent: bool) -> int:
+        """ Give id to new message, and add it to its shard's pending messages (sends the shard's batch when it
+        is full).
+
+        :return: The message ID.
+        :raises KeyError: if the recipient does not exist.
+        """
+        shard = self._shard_of(recipient)
+        message_id = next(self._next_ids[shard])
+        self.message_id = message_id
+        self._pending[shard].append((message_id, sender, recipient, title, message_body, bool(urgent)))
+        if len(self._pending[shard]) >= self.batch_size:
+            self._send_pending(shard)
+        return message_id
+
+    def send_message(self, sender: str, recipient: str, title: str, message_body: str, urgent: bool = False) -> int:
+        """ Send a message to a recipient, see PostOffice.send_message.
+
+        :return: The message ID.
+        :raises KeyError: if the recipient does not exist.
+        """
+        return self._queue(sender, recipient, title, message_body, urgent)
+
+    def send_many(self, messages: Iterable[tuple]) -> list[int]:
+        """ Send many messages, see PostOffice.send_many. The recipients of every chunk are checked before any of
+        its messages is sent.
+
+        :param messages: Iterable of (sender, recipient, title, message_body) or
+                         (sender, recipient, title, message_body, urgent) tuples.
+        :return: The ids of the sent messages.
+        :raises KeyError: if one of the recipients does not exist.
+        """
+        sent_ids = []
+        messages = iter(messages)
+        while chunk := list(islice(messages, PostOffice.SEND_MANY_CHUNK_SIZE)):
+            for recipient in {details[1] for details in chunk}:
+                if recipient not in self.usernames:
+                    raise KeyError(recipient)
+            for sender, recipient, title, message_body, *urgent in chunk:
+                sent_ids.append(self._queue(sender, recipient, title, message_body, bool(urgent and urgent[0])))
+        return sent_ids
+
+    def _call_user_shard(self, method: str, user_name: str, *arguments):
+        """ Run PostOffice's method on user_name's box at its shard, and returns the result. """
+        shard = self._shard_of(user_name)
+        return self._call_shards({shard: [(method, (user_name,) + arguments)]})[shard][0]
+
+    def read_inbox(self, user_name: str, number_of_messages: int = None) -> list[Type[Message]]:
+        """ Read user_name's box, see PostOffice.read_inbox. """
+        return self._call_user_shard("read_inbox", user_name, number_of_messages)
+
+    def read_inboxes(self, user_names: Iterable[str], number_of_messages: int = None) -> dict[str, list[Message]]:
+        """ Read the inboxes of many users, see PostOffice.read_inboxes. Every shard gets one batch of all of its
+        users' reads.
+
+        :raises KeyError: If one of the users' names doesn't exist (nothing is read in that case).
+        """
+        user_names = list(dict.fromkeys(user_names))
+        requests_by_shard = defaultdict(list)
+        for user_name in user_names:
+            requests_by_shard[self._shard_of(user_name)].append(("read_inbox", (user_name, number_of_messages)))
+        results = {shard: iter(shard_results) for shard, shard_results in self._call_shards(requests_by_shard).items()}
+        return {user_name: next(results[self._shard_of(user_name)]) for user_name in user_names}
+
+    def search_inbox(self, user_name: str, string: str) -> list[Type[Message]]:
+        """ Search in user_name's box, see PostOffice.search_inbox. """
+        return self._call_user_shard("search_inbox", user_name, string)
+
+    def search_inbox_by_word(self, user_name: str, word: str) -> list[Type[Message]]:
+        """ Search word in user_name's box, see PostOffice.search_inbox_by_word. """
+        return self._call_user_shard("search_inbox_by_word", user_name, word)
+
+    def close(self) -> None:
+        """ Send the pending messages and stop the workers (does nothing if already closed).
+        :return: None.
+        """
+        if not self._workers:
+            return
+        try:
+            self.flush()
+        finally:
+            for connection in self._connections:
+                connection.send(None)
+                connection.close()
+            for worker in self._workers:
+                worker.join()
+            self._connections, self._workers = [], []
+
 
 def main_post_office() -> None:
     """ Checking wanted post office's functions.
@@ -131,5 +1278,171 @@ def main_post_office() -> None:
     print("\n".join([str(message) for message in my_post_office.search_inbox("Itzik", "?")]))
 
 
+def benchmark_search_inbox(number_of_messages: int = 20000, repeat: int = 5) -> None:
+    """ Compare search_inbox with the linear scan and with the inverted index, and print the results.
+
+    :param number_of_messages: How many messages to send into the benchmarked box.
+    :param repeat: How many times to run every search.
+    :return: None.
+    """
+    post_offices = {"linear": PostOffice(["Itzik"]), "indexed": PostOffice(["Itzik"], indexed=True)}
+    for post_office in post_offices.values():
+        for i in range(number_of_messages):
+            post_office.send_message("Shay", "Itzik", f"Title number {i}", f"Message body number {i} with word{i % 97}",
+                                     urgent=i % 10 == 0)
+
+    for string in ("word42", "number 1234", "missing"):
+        results = {name: post_office.search_inbox("Itzik", string) for name, post_office in post_offices.items()}
+        assert [message.message_id for message in results["linear"]] == \
+               [message.message_id for message in results["indexed"]]
+        timings = {name: timeit.timeit(lambda: post_office.search_inbox("Itzik", string), number=repeat) / repeat
+                   for name, post_office in post_offices.items()}
+        print(f"search {string!r} ({len(results['linear'])} results): linear {timings['linear'] * 1000:.3f}ms, "
+              f"indexed {timings['indexed'] * 1000:.3f}ms")
+
+
+def benchmark_message_memory(number_of_messages: int = 100000) -> None:
+    """ Print how many bytes every message takes: Message without __slots__ (as it was before), Message with
+    __slots__ at Inbox, and ColumnarInbox.
+
+    :param number_of_messages: How many messages to create for every measure.
+    :return: None.
+    """
+    dict_message = type("DictMessage", (), {"__init__": Message.__init__, "__qualname__": "DictMessage"})
+    senders = ["Shay", "Emanuel", "Sharon", "Itzik"]
+
+    def measure(create_box: Callable[[], object], add: Callable[[object, int, str, str, str], None]) -> float:
+        tracemalloc.start()
+        box = create_box()
+        for i in range(number_of_messages):
+            add(box, i, "Title", "Body", senders[i % len(senders)])
+        memory, _ = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        return memory / number_of_messages
+
+    results = {
+        "dict Message at list": measure(list, lambda box, *details: box.append(dict_message(*details))),
+        "__slots__ Message at Inbox": measure(Inbox, lambda box, *details: box.add(Message(*details))),
+        "ColumnarInbox": measure(ColumnarInbox, lambda box, *details: box.add(Message(*details))),
+    }
+    for name, bytes_per_message in results.items():
+        print(f"{name}: {bytes_per_message:.1f} bytes per message")
+
+
+def stress_test_concurrent_post_office(number_of_threads: int = 16, messages_per_thread: int = 2000) -> None:
+    """ Send and read messages from many threads at once, and check that every id is unique and that no
+    message was lost.
+
+    :param number_of_threads: How many threads to run.
+    :param messages_per_thread: How many messages every thread sends.
+    :return: None.
+    :raises AssertionError: If an id was given twice or a message was lost.
+    """
+    usernames = [f"user{i}" for i in range(number_of_threads // 2 + 1)]
+    post_office = ConcurrentPostOffice(usernames, number_of_locks=4)
+    sent_ids = [[] for _ in range(number_of_threads)]
+    read_ids = [[] for _ in range(number_of_threads)]
+
+    def work(thread_number: int) -> None:
+        for i in range(messages_per_thread):
+            recipient = usernames[(thread_number + i) % len(usernames)]
+            sent_ids[thread_number].append(post_office.send_message(f"thread{thread_number}", recipient, "Title",
+                                                                    "Body", urgent=i % 3 == 0))
+            if i % 10 == 0:
+                read_ids[thread_number].extend(message.message_id for message in post_office.read_inbox(recipient))
+        sent_ids[thread_number].extend(post_office.send_many(
+            (f"thread{thread_number}", usernames[i % len(usernames)], "Title", "Body") for i in range(100)))
+
+    threads = [threading.Thread(target=work, args=(i,)) for i in range(number_of_threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    all_sent = [message_id for thread_ids in sent_ids for message_id in thread_ids]
+    all_read = [message_id for thread_ids in read_ids for message_id in thread_ids]
+    all_read.extend(message.message_id for message in chain.from_iterable(post_office.read_inboxes(usernames).values()))
+    assert len(all_sent) == len(set(all_sent)) == number_of_threads * (messages_per_thread + 100)
+    assert sorted(all_read) == sorted(all_sent)
+    assert sum(len(box) for box in post_office.boxes.values()) == len(all_sent)
+    print(f"{len(all_sent)} messages sent from {number_of_threads} threads, all ids unique, no message lost")
+
+
+def stress_test_concurrent_log_replay(number_of_threads: int = 8, messages_per_thread: int = 1000) -> None:
+    """ Send and read messages from many threads at once at ConcurrentPostOffice with a log, then load the log
+    into new PostOffice and check that it has the same boxes.
+
+    :param number_of_threads: How many threads to run.
+    :param messages_per_thread: How many messages every thread sends with send_message (and as many with
+                                send_many).
+    :return: None.
+    :raises AssertionError: If the loaded boxes are different from the live ones.
+    """
+    usernames = [f"user{i}" for i in range(4)]
+    with tempfile.TemporaryDirectory() as log_directory:
+        log_path = os.path.join(log_directory, "post_office.log")
+        post_office = ConcurrentPostOffice(usernames, number_of_locks=4, log=MessageLog(log_path, fsync=False))
+
+        def work(thread_number: int) -> None:
+            for i in range(messages_per_thread // 10):
+                for j in range(10):
+                    post_office.send_message(f"thread{thread_number}", usernames[(i + j) % len(usernames)], "Title",
+                                             "Body", urgent=j % 3 == 0)
+                post_office.send_many((f"thread{thread_number}", usernames[(i + j) % len(usernames)], "Title", "Body",
+                                       j % 4 == 0) for j in range(10))
+                post_office.read_inbox(usernames[i % len(usernames)], 5)
+
+        threads = [threading.Thread(target=work, args=(i,)) for i in range(number_of_threads)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        post_office.log.close()
+
+        loaded_post_office = PostOffice([], log=MessageLog(log_path, fsync=False))
+        loaded_post_office.log.close()
+        for user in usernames:
+            live = [(message.message_id, message.is_read(), urgent)
+                    for message, urgent in post_office.boxes[user].entries()]
+            loaded = [(message.message_id, message.is_read(), urgent)
+                      for message, urgent in loaded_post_office.boxes[user].entries()]
+            assert live == loaded, f"{user}'s box is different after loading the log"
+    print(f"{number_of_threads} threads wrote into the log, the loaded boxes are the same as the live ones")
+
+
+def benchmark_sharded_post_office(number_of_messages: int = 200000, number_of_users: int = 100,
+                                  shards: int = 4) -> None:
+    """ Compare sending messages and searching all of the boxes at PostOffice and at ShardedPostOffice (both
+    indexed), check that they have the same messages, and print the results.
+
+    :param number_of_messages: How many messages to send.
+    :param number_of_users: How many users to split the messages between.
+    :param shards: Number of ShardedPostOffice's worker processes.
+    :return: None.
+    :raises AssertionError: If the post offices have different messages.
+    """
+    usernames = [f"user{i}" for i in range(number_of_users)]
+    messages = [("Shay", usernames[i % number_of_users], f"Title {i}", f"Body number {i} with word{i % 97}",
+                 i % 10 == 0) for i in range(number_of_messages)]
+
+    post_office = PostOffice(usernames, indexed=True)
+    start = time.perf_counter()
+    post_office.send_many(messages)
+    local_results = {user: post_office.search_inbox(user, "word42") for user in usernames}
+    local_seconds = time.perf_counter() - start
+
+    with ShardedPostOffice(usernames, shards=shards, indexed=True) as sharded_post_office:
+        start = time.perf_counter()
+        sharded_post_office.send_many(messages)
+        sharded_results = {user: sharded_post_office.search_inbox(user, "word42") for user in usernames}
+        sharded_seconds = time.perf_counter() - start
+
+    for user in usernames:
+        assert [(message.title, message.body) for message in local_results[user]] == \
+               [(message.title, message.body) for message in sharded_results[user]]
+    print(f"{number_of_messages} messages: PostOffice {local_seconds:.3f}s, "
+          f"ShardedPostOffice with {shards} shards {sharded_seconds:.3f}s")
+
+
 if __name__ == "__main__":
     main_post_office()
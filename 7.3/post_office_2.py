@@ -18,6 +18,7 @@ class Message:
     :param body: The body of the message.
     :param sender: The name of the person that sent the message.
     """
+    __slots__ = ("message_id", "title", "body", "sender", "is_read_before")
 
     def __init__(self, message_id: int, title: str, body: str, sender: str):
         self.message_id = message_id
@@ -1,9 +1,20 @@
+import codecs
+import mmap
+import os
+import re
+import struct
+import tempfile
+import time
 from abc import ABC, abstractmethod
-from typing import Literal, Tuple, Union
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from bisect import bisect_right
+from typing import Iterable, Iterator, Literal, Tuple, Union
 
 
 FILE_TYPE = Literal["binary", "txt", "directory"]
 POSSIBLE_FILE_TYPE = Union['TextualFile', 'BinaryFile', 'Directory']
+TERM_PATTERN = re.compile(r"\w+")
 
 
 class User(ABC):
@@ -46,6 +57,7 @@ class User(ABC):
 
 class SystemAdministratorUser(User):
     """ A System administrator user class. Inherits from User class."""
+
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
 
@@ -56,10 +68,149 @@ class RegularUser(User):
         super().__init__(**kwargs)
 
 
+class Content(ABC):
+    """ A Content class, for file's content that is not kept as one string. The bytes are loaded only when
+    needed.
+
+    :ivar text_encoding: The encoding of the bytes when they are text (read returns string then), else None.
+    """
+    DEFAULT_CHUNK_SIZE = 1 << 16
+    text_encoding = None
+
+    @abstractmethod
+    def get_size(self) -> int:
+        """ Returns the content's size in bytes (without loading it).
+        :return: Size in bytes.
+        """
+
+    @abstractmethod
+    def read_range(self, start: int, length: int) -> bytes:
+        """ Returns part of the content.
+        :param start: Offset of the first wanted byte.
+        :param length: Maximum number of bytes.
+        :return: The bytes (less than length at the end of the content).
+        """
+
+    def read_chunks(self, chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        """ Returns the content in chunks, so it is not loaded at once.
+        :param chunk_size: Maximum chunk's size.
+        :return: Iterator of bytes.
+        """
+        for start in range(0, self.get_size(), chunk_size):
+            yield self.read_range(start, chunk_size)
+
+    def load(self) -> bytes:
+        """ Returns all of the content.
+        :return: The content's bytes.
+        """
+        return self.read_range(0, self.get_size())
+
+
+class BytesContent(Content):
+    """ A BytesContent class, inherits from Content class. Content kept as bytes.
+
+    :ivar _data: The content.
+
+    :param data: The content.
+    :param text_encoding: Optional, the encoding of the bytes when they are text.
+    """
+    def __init__(self, data: bytes, text_encoding: str = None):
+        self._data = data
+        self.text_encoding = text_encoding
+
+    def get_size(self) -> int:
+        return len(self._data)
+
+    def read_range(self, start: int, length: int) -> bytes:
+        return self._data[start:start + length]
+
+    def load(self) -> bytes:
+        return self._data
+
+
+class ChunkedContent(Content):
+    """ A ChunkedContent class, inherits from Content class. Content kept as list of chunks (for example, as it
+    was received), so it is not copied into one big bytes object.
+
+    :ivar _chunks: The content's chunks.
+    :ivar _chunk_starts: Offset of every chunk's start.
+
+    :param chunks: The content's chunks.
+    :param text_encoding: Optional, the encoding of the bytes when they are text.
+    """
+    def __init__(self, chunks: Iterable[bytes], text_encoding: str = None):
+        self.text_encoding = text_encoding
+        self._chunks = [bytes(chunk) for chunk in chunks if chunk]
+        self._chunk_starts = []
+        offset = 0
+        for chunk in self._chunks:
+            self._chunk_starts.append(offset)
+            offset += len(chunk)
+        self._size = offset
+
+    def get_size(self) -> int:
+        return self._size
+
+    def read_range(self, start: int, length: int) -> bytes:
+        parts = []
+        index = max(bisect_right(self._chunk_starts, start) - 1, 0)
+        end = min(start + length, self._size)
+        while index < len(self._chunks) and self._chunk_starts[index] < end:
+            chunk_start = self._chunk_starts[index]
+            parts.append(self._chunks[index][max(start - chunk_start, 0):end - chunk_start])
+            index += 1
+        return b"".join(parts)
+
+    def read_chunks(self, chunk_size: int = Content.DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        for chunk in self._chunks:
+            for start in range(0, len(chunk), chunk_size):
+                yield chunk[start:start + chunk_size]
+
+
+class MappedFileContent(Content):
+    """ A MappedFileContent class, inherits from Content class. Content that stays at a file on disk and is
+    read through memory mapping, only the parts that are asked for.
+
+    :ivar path: The file's path.
+    :ivar _offset: Where the content starts at the file.
+    :ivar _size: The content's size.
+
+    :param path: The file's path.
+    :param offset: Optional, where the content starts at the file.
+    :param size: Optional, the content's size, the default is until the end of the file.
+    :param text_encoding: Optional, the encoding of the bytes when they are text.
+    """
+    def __init__(self, path: str, offset: int = 0, size: int = None, text_encoding: str = None):
+        self.path = path
+        self._offset = offset
+        self._size = os.path.getsize(path) - offset if size is None else size
+        self.text_encoding = text_encoding
+
+    def get_size(self) -> int:
+        return self._size
+
+    def read_range(self, start: int, length: int) -> bytes:
+        start, end = self._offset + start, self._offset + min(start + length, self._size)
+        if end <= start:
+            return b""
+        with open(self.path, "rb") as content_file, \
+                mmap.mmap(content_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            return mapped[start:end]
+
+    def read_chunks(self, chunk_size: int = Content.DEFAULT_CHUNK_SIZE) -> Iterator[bytes]:
+        if not self._size:
+            return
+        with open(self.path, "rb") as content_file, \
+                mmap.mmap(content_file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            for start in range(self._offset, self._offset + self._size, chunk_size):
+                yield mapped[start:min(start + chunk_size, self._offset + self._size)]
+
+
 class File(ABC):
     """ A File class to manage files.
 
     :ivar file_name: File's name.
+    :ivar _parent: The directory that holds the file, None if it isn't in a directory.
 
     :param file_name: File's name.
 
@@ -67,20 +218,49 @@ class File(ABC):
     @abstractmethod
     def __init__(self, file_name: str):
         self.file_name = file_name
+        self._parent = None
 
     def rename(self, new_name: str = "") -> None:
-        """ Rename file's name.
+        """ Rename file's name. If the file is inside a directory, the directory is updated too.
         :param new_name: The new file's name.
         :return: None.
+        :raises: ValueError if there is already file named new_name at the file's directory.
         """
+        if self._parent is not None and new_name != self.file_name:
+            self._parent._rename_file(self.file_name, new_name)
         self.file_name = new_name
 
+    def get_parent(self) -> Union['Directory', None]:
+        """ Returns the directory that holds the file.
+        :return: The directory, None if the file isn't in a directory.
+        """
+        return self._parent
+
+    def get_path(self, relative_to: 'Directory' = None) -> str:
+        """ Returns the file's path, by going up through its parent directories.
+        :param relative_to: Optional, directory to return the path relative to. The default is the top directory
+                            (the path then starts with its name).
+        :return: The names of the directories from there to the file, and the file's name, separated by "/".
+        """
+        names, file = [], self
+        while file is not None and file is not relative_to:
+            names.append(file.get_name())
+            file = file.get_parent()
+        return Directory.PATH_SEPARATOR.join(reversed(names))
+
     def get_name(self) -> str:
         """ Returns file's name.
         :return: File's name.
         """
         return self.file_name
 
+    def _get_totals(self) -> Tuple[int, int]:
+        """ Returns the size in bytes and the number of readable files the file holds (for directory - all of
+        the files under it).
+        :return: Size in bytes and number of files.
+        """
+        return 0, 0
+
     def __str__(self) -> str:
         return str(self.file_name)
 
@@ -90,7 +270,8 @@ class ReadableFile(File):
 
     :ivar file_name: File's name.
     :ivar float _weight_in_kilobytes: The weight of the file in kilobytes.
-    :ivar content: File's content.
+    :ivar int _size_in_bytes: The size of the content's UTF-8 encoding.
+    :ivar content: File's content, string or Content object (bytes, chunks or file on disk, loaded when read).
     :ivar _creator: User's object to hold the details about the creator of that file.
 
     :param file_name: File's name.
@@ -99,90 +280,490 @@ class ReadableFile(File):
 
     """
     _NUMBER_OF_BYTES_IN_KILOBYTE = 1024
+    _ENCODE_CHUNK_LENGTH = 1 << 16
 
-    def __init__(self, file_name: str, content: str = "", creator: User = None):
+    def __init__(self, file_name: str, content: Union[str, Content] = "", creator: User = None):
         super().__init__(file_name)
         self._content = ""
         self._weight_in_kilobytes = 0.0
+        self._size_in_bytes = 0
         self._creator = creator
         self.set_content(content)
 
-    def read(self, user: User) -> Union[str, None]:
+    def read(self, user: User) -> Union[str, bytes, None]:
         """ Check if the user that wants to read the file is the one who creates it or the Administrator.
          If it is, return the file's content. Else, None.
 
         :param user: User's object.
-        :return: The file's content or None depends on what kind of user is.
+        :return: The file's content (Content object is loaded now, bytes unless it is text) or None depends on
+                 what kind of user is.
         """
-        if user == self._creator or isinstance(user, SystemAdministratorUser):
+        if self.can_read(user):
+            return self._load_content()
+
+    def _load_content(self) -> Union[str, bytes]:
+        """ Returns the content, loads it if it is Content object.
+        :return: The content (bytes when it is Content object of bytes that are not text).
+        """
+        if not isinstance(self._content, Content):
             return self._content
+        data = self._content.load()
+        return data.decode(self._content.text_encoding) if self._content.text_encoding else data
+
+    def read_chunks(self, user: User,
+                    chunk_size: int = Content.DEFAULT_CHUNK_SIZE) -> Union[Iterator[Union[str, bytes]], None]:
+        """ Same as read, but returns the content in chunks so it is not loaded at once.
+
+        :param user: User's object.
+        :param chunk_size: Maximum chunk's size.
+        :return: Iterator of the content's chunks or None depends on what kind of user is.
+        """
+        if not self.can_read(user):
+            return None
+        if isinstance(self._content, Content) and self._content.text_encoding:
+            return self._decode_chunks(chunk_size)
+        if isinstance(self._content, Content):
+            return self._content.read_chunks(chunk_size)
+        return (self._content[start:start + chunk_size] for start in range(0, len(self._content), chunk_size))
+
+    def _decode_chunks(self, chunk_size: int) -> Iterator[str]:
+        """ Returns the text content's chunks decoded (a character that is split between chunks is returned with
+        the later chunk).
+
+        :param chunk_size: Maximum chunk's size in bytes.
+        :return: Iterator of strings.
+        :raises: UnicodeDecodeError if the content ends in the middle of a character.
+        """
+        decoder = codecs.getincrementaldecoder(self._content.text_encoding)()
+        for chunk in self._content.read_chunks(chunk_size):
+            yield decoder.decode(chunk)
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+    def can_read(self, user: User) -> bool:
+        """ Returns if the user can read the file: the one who creates it or the Administrator.
+
+        :param user: User's object.
+        :return: True if the user can read the file, otherwise false.
+        """
+        return user == self._creator or isinstance(user, SystemAdministratorUser)
 
-    def set_content(self, content: str) -> None:
+    def set_content(self, content: Union[str, Content]) -> None:
         """ Sets file's content and changes its weight according to the new content.
 
         :param content: The new content.
         :return: None.
         """
+        old_size = self._size_in_bytes
         self._content = content
-        self._weight_in_kilobytes = len(self._content.encode('utf-8')) / self._NUMBER_OF_BYTES_IN_KILOBYTE
+        self._size_in_bytes = content.get_size() if isinstance(content, Content) else self._utf8_size(content)
+        self._weight_in_kilobytes = self._size_in_bytes / self._NUMBER_OF_BYTES_IN_KILOBYTE
+        if self._parent is not None:
+            self._parent._add_to_totals(self._size_in_bytes - old_size, 0)
+
+    @classmethod
+    def _utf8_size(cls, content: str) -> int:
+        """ Returns the size of the content's UTF-8 encoding, without encoding all of it at once.
+
+        :param content: The content.
+        :return: Size in bytes.
+        """
+        if content.isascii():
+            return len(content)
+        return sum(len(content[start:start + cls._ENCODE_CHUNK_LENGTH].encode('utf-8'))
+                   for start in range(0, len(content), cls._ENCODE_CHUNK_LENGTH))
+
+    def _read_range(self, start: int, length: int) -> bytes:
+        """ Returns part of the content's bytes. The bytes of string content are its UTF-8 encoding, same as
+        its size and its bytes at a snapshot (binary data should be kept as BytesContent).
+
+        :param start: Offset of the first wanted byte.
+        :param length: Maximum number of bytes.
+        :return: The bytes.
+        """
+        if isinstance(self._content, Content):
+            return self._content.read_range(start, length)
+        # Every character is at least one byte, so the first start + length characters include the range.
+        return self._content[:start + length].encode('utf-8')[start:start + length]
+
+    def get_weight_in_kilobytes(self) -> float:
+        """ Returns the weight of the file in kilobytes.
+        :return: Weight in kilobytes.
+        """
+        return self._weight_in_kilobytes
+
+    def _get_totals(self) -> Tuple[int, int]:
+        return self._size_in_bytes, 1
 
 
 class TextualFile(ReadableFile):
     """ A Textual File class, inherits from ReadableFile class.
+
+    Keeps caches that are cleared when the content changes: the lowered content, counts of the last searched
+    strings and the content's terms (lowered words).
+
+    :ivar _lowered_content: The lowered content, None until it is needed.
+    :ivar _counts: Lowered string -> how many times it appears inside the content.
+    :ivar _terms: The content's terms, None until they are needed.
     """
+    MAX_CACHED_COUNTS = 64
+
+    def set_content(self, content: Union[str, Content]) -> None:
+        """ Sets file's content, clears the caches and updates the directory's terms index.
+
+        :param content: The new content.
+        :return: None.
+        """
+        old_terms = self.get_terms() if self._parent is not None and self._parent._terms_index is not None else None
+        super().set_content(content)
+        self._lowered_content = None
+        self._counts = {}
+        self._terms = None
+        if old_terms is not None:
+            self._parent._index_terms(self, old_terms)
+
+    def _get_lowered_content(self) -> str:
+        """ Returns the lowered content (lowered once after every change).
+        :return: The lowered content.
+        """
+        if self._lowered_content is None:
+            content = self._load_content()
+            self._lowered_content = (content.decode('utf-8') if isinstance(content, bytes) else content).lower()
+        return self._lowered_content
+
+    def get_terms(self) -> frozenset[str]:
+        """ Returns the lowered words of the content.
+        :return: Set of words.
+        """
+        if self._terms is None:
+            self._terms = frozenset(TERM_PATTERN.findall(self._get_lowered_content()))
+        return self._terms
+
     def count(self, search_for_string: str) -> int:
         """ Receives a string and returns how many times it appears inside the file's content.
 
         :param search_for_string: String to search for it inside file's content.
         :return: How many time it appeared.
         """
-        return self._content.lower().count(search_for_string.lower())
+        lowered_string = search_for_string.lower()
+        if lowered_string not in self._counts:
+            if len(self._counts) >= self.MAX_CACHED_COUNTS:
+                self._counts.pop(next(iter(self._counts)))
+            self._counts[lowered_string] = self._get_lowered_content().count(lowered_string)
+        return self._counts[lowered_string]
 
 
 class BinaryFile(ReadableFile):
     """ A Binary File class, inherits from ReadableFile class.
     """
+    _JPEG_START_OF_FRAME_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+
     def get_dimensions(self) -> Tuple[float, float]:
-        """ Returns width and height of the picture.
+        """ Returns width and height of the picture. Only the header of the picture is read (PNG, GIF, BMP and JPEG
+        are supported).
         :return: Width and height.
+        :raises: ValueError if the content is not a picture of supported format.
         """
-        pass
+        header = self._read_range(0, 26)
+        if header.startswith(b"\x89PNG\r\n\x1a\n") and len(header) >= 24:
+            return struct.unpack(">II", header[16:24])
+        if header[:6] in (b"GIF87a", b"GIF89a") and len(header) >= 10:
+            return struct.unpack("<HH", header[6:10])
+        if header.startswith(b"BM") and len(header) >= 26:
+            width, height = struct.unpack("<ii", header[18:26])
+            return width, abs(height)
+        if header.startswith(b"\xff\xd8"):
+            return self._get_jpeg_dimensions()
+        raise ValueError(f"The file {self.file_name} is not a picture of supported format.")
+
+    def _get_jpeg_dimensions(self) -> Tuple[float, float]:
+        """ Returns width and height of JPEG picture, by going over its segments until the frame's header.
+        :return: Width and height.
+        :raises: ValueError if the frame's header was not found.
+        """
+        offset = 2
+        while True:
+            segment_header = self._read_range(offset, 4)
+            if len(segment_header) < 4 or segment_header[0] != 0xFF:
+                raise ValueError(f"The file {self.file_name} is not a valid JPEG picture.")
+            if segment_header[1] == 0xFF:
+                offset += 1
+                continue
+            marker, length = segment_header[1], struct.unpack(">H", segment_header[2:4])[0]
+            if marker in self._JPEG_START_OF_FRAME_MARKERS:
+                frame_header = self._read_range(offset + 5, 4)
+                if len(frame_header) < 4:
+                    raise ValueError(f"The file {self.file_name} is not a valid JPEG picture.")
+                height, width = struct.unpack(">HH", frame_header)
+                return width, height
+            offset += 2 + length
 
 
 class Directory(File):
     """ A Directory class, inherits from File class.
 
-    :ivar: _my_files: For file list.
+    :ivar: _entries: The files by the order they were added, None at the places of deleted files.
+    :ivar: _entry_indexes: File's name -> the file's index at _entries.
+    :ivar: _deleted_entries: Number of None places at _entries.
+    :ivar: _resolved_paths: Cache of the last resolved paths: path -> (tree version, file).
+    :ivar: _total_size_in_bytes: The size of all of the readable files under the directory.
+    :ivar: _total_files: The number of readable files under the directory.
+    :ivar: _terms_index: Term -> the textual files at the directory (not under sub directories) that include it,
+                         None until the first search.
+    :ivar: _files_by_creator: Creator -> the readable files at the directory (not under sub directories) that he
+                              created (as dictionary keys, to keep the directory's order).
     """
+    PATH_SEPARATOR = "/"
+    RESOLVED_PATHS_CACHE_SIZE = 256
+    # Changed on every add/delete/rename at any directory, so cached paths that were resolved before are ignored.
+    _tree_version = 0
+
     def __init__(self, file_name):
         super().__init__(file_name)
-        self._my_files = []
+        self._entries = []
+        self._entry_indexes = {}
+        self._deleted_entries = 0
+        self._resolved_paths = OrderedDict()
+        self._total_size_in_bytes = 0
+        self._total_files = 0
+        self._terms_index = None
+        self._files_by_creator = {}
+
+    @classmethod
+    def _tree_changed(cls) -> None:
+        """ Invalidate the resolved paths caches of all of the directories.
+        :return: None.
+        """
+        Directory._tree_version += 1
 
     def add_file(self, file: POSSIBLE_FILE_TYPE) -> None:
-        """ Add a file into the list if its name doesn't exist in the files' list.
+        """ Add a file into the directory if its name doesn't exist in the directory. A file that is already
+        inside another directory is moved: it is deleted from there first.
 
         :param file: File object.
         :return: None.
-        :raises: ValueError if file's name already at the list. 
+        :raises: ValueError if file's name already at the list, or if the file is the directory or one of the
+                 directories above it.
         """
         try:
-            if not self.get_file(file.get_name()):
-                self._my_files.append(file)
-            else:
+            if file.get_name() in self._entry_indexes:
                 raise ValueError(f"There is already file named {file.get_name()} at the current directory.")
+            directory = self
+            while directory is not None:
+                if directory is file:
+                    raise ValueError(f"Can't add directory {file.get_name()} into itself.")
+                directory = directory._parent
+            if file._parent is not None:
+                file._parent.delete_file(file.get_name())
+            self._attach(file)
 
         except ValueError as error:
             print(error)
 
+    def _attach(self, file: POSSIBLE_FILE_TYPE) -> None:
+        """ Put file into the directory (its name should not exist at the directory).
+
+        :param file: File object.
+        :return: None.
+        """
+        self._entry_indexes[file.get_name()] = len(self._entries)
+        self._entries.append(file)
+        file._parent = self
+        self._add_to_totals(*file._get_totals())
+        if isinstance(file, TextualFile) and self._terms_index is not None:
+            self._index_terms(file)
+        if isinstance(file, ReadableFile):
+            self._files_by_creator.setdefault(file._creator, {})[file] = None
+        self._tree_changed()
+
     def delete_file(self, file_name) -> None:
-        """ Delete file from list.
+        """ Delete file from the directory.
         :param file_name: The wanted file to delete. 
         :return: None.
+        :raises: ValueError if there is no file with that name at the directory.
+        """
+        if file_name not in self._entry_indexes:
+            raise ValueError(f"There is no file named {file_name} at the current directory.")
+        index = self._entry_indexes.pop(file_name)
+        deleted_file, self._entries[index] = self._entries[index], None
+        self._deleted_entries += 1
+        if self._deleted_entries > len(self._entries) // 2:
+            self._compact_entries()
+        deleted_file._parent = None
+        size_in_bytes, files = deleted_file._get_totals()
+        self._add_to_totals(-size_in_bytes, -files)
+        if isinstance(deleted_file, TextualFile) and self._terms_index is not None:
+            self._index_terms(deleted_file, deleted_file.get_terms(), frozenset())
+        if isinstance(deleted_file, ReadableFile):
+            creator_files = self._files_by_creator[deleted_file._creator]
+            del creator_files[deleted_file]
+            if not creator_files:
+                del self._files_by_creator[deleted_file._creator]
+        self._tree_changed()
+
+    def _compact_entries(self) -> None:
+        """ Remove the places of the deleted files from _entries (done when they are more than half of it, so
+        deleting stays O(1) on average).
+        :return: None.
+        """
+        self._entries = [file for file in self._entries if file is not None]
+        self._entry_indexes = {file.get_name(): index for index, file in enumerate(self._entries)}
+        self._deleted_entries = 0
+
+    def _files(self) -> Iterator[POSSIBLE_FILE_TYPE]:
+        """ Returns the files inside the directory, by the order they were added. """
+        return (file for file in self._entries if file is not None)
+
+    def _index_terms(self, file: 'TextualFile', old_terms: frozenset[str] = frozenset(),
+                     new_terms: frozenset[str] = None) -> None:
+        """ Update the terms index after textual file was added, deleted or changed.
+
+        :param file: The textual file.
+        :param old_terms: The terms the file was indexed by.
+        :param new_terms: The terms to index the file by, the default is its current terms.
+        :return: None.
+        """
+        new_terms = file.get_terms() if new_terms is None else new_terms
+        for term in old_terms - new_terms:
+            files = self._terms_index[term]
+            files.discard(file)
+            if not files:
+                del self._terms_index[term]
+        for term in new_terms - old_terms:
+            self._terms_index.setdefault(term, set()).add(file)
+
+    def _candidates(self, lowered_string: str) -> list['TextualFile']:
+        """ Returns the textual files at the directory that may include the string: the files that include all
+        of its words. A word inside the string must be a whole term of the file, and a word at the start or the
+        end of the string (it may continue at the content) must be part of one of the file's terms, so the terms
+        that include it are looked up at the index's vocabulary.
+
+        :param lowered_string: Lowered string to search for.
+        :return: List of textual files, by the directory's order.
+        """
+        words = list(TERM_PATTERN.finditer(lowered_string))
+        if not words:
+            return [file for file in self._files() if isinstance(file, TextualFile)]
+        if self._terms_index is None:
+            self._terms_index = {}
+            for file in self._files():
+                if isinstance(file, TextualFile):
+                    self._index_terms(file)
+        # Whole terms first, they are cheaper to look up and usually leave fewer files.
+        words.sort(key=lambda match: not (match.start() > 0 and match.end() < len(lowered_string)))
+        files = None
+        for match in words:
+            word = match.group()
+            if match.start() > 0 and match.end() < len(lowered_string):
+                word_files = self._terms_index.get(word, set())
+            else:
+                word_files = set().union(*(term_files for term, term_files in self._terms_index.items()
+                                           if word in term))
+            files = word_files if files is None else files & word_files
+            if not files:
+                return []
+        return [file for file in self._files() if file in files]
+
+    def find(self, search_for_string: str, user: User) -> list['TextualFile']:
+        """ Returns the textual files under the directory (at any depth) that include the string (case
+        insensitive) and the user can read.
+
+        :param search_for_string: String to search for.
+        :param user: User's object.
+        :return: List of textual files.
+        """
+        lowered_string = search_for_string.lower()
+        return [file for directory, _ in self.walk() for file in directory._candidates(lowered_string)
+                if file.can_read(user) and file.count(lowered_string)]
+
+    def count(self, search_for_string: str, user: User) -> int:
+        """ Returns how many times the string appears (case insensitive) inside the textual files under the
+        directory (at any depth) that the user can read.
+
+        :param search_for_string: String to search for.
+        :param user: User's object.
+        :return: How many time it appeared.
+        """
+        return sum(file.count(search_for_string) for file in self.find(search_for_string, user))
+
+    def _readable_files_here(self, user: User) -> list[ReadableFile]:
+        """ Returns the readable files at the directory (not under sub directories) that the user can read.
+
+        :param user: User's object.
+        :return: List of readable files.
+        """
+        if isinstance(user, SystemAdministratorUser):
+            return [file for file in self._files() if isinstance(file, ReadableFile)]
+        return list(self._files_by_creator.get(user, ()))
+
+    def readable_files(self, user: User) -> list[ReadableFile]:
+        """ Returns all of the readable files under the directory (at any depth) that the user can read. Only the
+        files the user created are looked at (every directory keeps its files by creator), unless the user is
+        administrator.
+
+        :param user: User's object.
+        :return: List of readable files.
+        """
+        return [file for directory, _ in self.walk() for file in directory._readable_files_here(user)]
+
+    def readable_files_by_user(self, users: Iterable[User]) -> dict[User, list[ReadableFile]]:
+        """ Returns the files every user can read under the directory, at one walk over the directories.
+
+        :param users: Users' objects.
+        :return: Dictionary of user -> list of readable files.
+        """
+        users = list(users)
+        readable = {user: [] for user in users}
+        for directory, _ in self.walk():
+            for user in users:
+                readable[user].extend(directory._readable_files_here(user))
+        return readable
+
+    def _add_to_totals(self, size_delta: int, files_delta: int) -> None:
+        """ Update the totals of the directory and of all of the directories above it.
+
+        :param size_delta: Bytes added (negative when removed).
+        :param files_delta: Files added (negative when removed).
+        :return: None.
+        """
+        directory = self
+        while directory is not None:
+            directory._total_size_in_bytes += size_delta
+            directory._total_files += files_delta
+            directory = directory._parent
+
+    def _get_totals(self) -> Tuple[int, int]:
+        return self._total_size_in_bytes, self._total_files
+
+    def get_weight_in_kilobytes(self) -> float:
+        """ Returns the weight of all of the files under the directory in kilobytes.
+        :return: Weight in kilobytes.
+        """
+        return self._total_size_in_bytes / ReadableFile._NUMBER_OF_BYTES_IN_KILOBYTE
+
+    def get_files_count(self) -> int:
+        """ Returns the number of readable files under the directory (at any depth).
+        :return: Number of files.
+        """
+        return self._total_files
+
+    def _rename_file(self, old_name: str, new_name: str) -> None:
+        """ Change the name a file is kept by (called when a file inside the directory is renamed). The file
+        keeps its place at the directory's order.
+
+        :param old_name: The file's current name.
+        :param new_name: The file's new name.
+        :return: None.
+        :raises: ValueError if there is already file named new_name at the directory.
         """
-        self._my_files.pop(self._my_files.index(self.get_file(file_name)))
-        
+        if new_name in self._entry_indexes:
+            raise ValueError(f"There is already file named {new_name} at the current directory.")
+        self._entry_indexes[new_name] = self._entry_indexes.pop(old_name)
+        self._tree_changed()
+
     def __str__(self) -> str:
-        return f"In directory named: {self.file_name}\n" + "\n".join([str(file) for file in self._my_files])
+        return f"In directory named: {self.file_name}\n" + "\n".join([str(file) for file in self._files()])
 
     def get_file(self, file_name: str) -> POSSIBLE_FILE_TYPE:
         """ Receives file's name and return it if it is exist.
@@ -190,9 +771,271 @@ class Directory(File):
         :param file_name: File's name.
         :return: One of the possible types of file if it is exist. Else, None.
         """
-        for file in self._my_files:
-            if file.get_name() == file_name:
-                return file
+        index = self._entry_indexes.get(file_name)
+        return None if index is None else self._entries[index]
+
+    def get_number_of_entries(self) -> int:
+        """ Returns the number of files (including directories) directly at the directory.
+        :return: Number of files.
+        """
+        return len(self._entry_indexes)
+
+    def get_files(self) -> list[POSSIBLE_FILE_TYPE]:
+        """ Returns the files inside the directory, by the order they were added.
+        :return: List of files.
+        """
+        return list(self._files())
+
+    def resolve(self, path: str) -> POSSIBLE_FILE_TYPE:
+        """ Receives path like "a/b/c" (relative to the current directory) and return the file at that path.
+        "." means the same directory and ".." means the parent directory. The last resolved paths are cached.
+
+        :param path: Path to file, the names are separated by "/".
+        :return: One of the possible types of file if it is exist. Else, None.
+        """
+        cached = self._resolved_paths.get(path)
+        if cached is not None and cached[0] == Directory._tree_version:
+            self._resolved_paths.move_to_end(path)
+            return cached[1]
+
+        file = self
+        for name in path.split(self.PATH_SEPARATOR):
+            if name in ("", "."):
+                continue
+            if not isinstance(file, Directory):
+                file = None
+                break
+            file = file.get_parent() if name == ".." else file.get_file(name)
+
+        self._resolved_paths[path] = (Directory._tree_version, file)
+        self._resolved_paths.move_to_end(path)
+        if len(self._resolved_paths) > self.RESOLVED_PATHS_CACHE_SIZE:
+            self._resolved_paths.popitem(last=False)
+        return file
+
+    def walk(self) -> Iterator[Tuple['Directory', list[POSSIBLE_FILE_TYPE]]]:
+        """ Goes over all of the directories inside the current one (including it), like os.walk: parent
+        directory before its sub directories. Uses a stack instead of recursion, so the tree's depth is not
+        limited.
+
+        Note: Paths are not built while walking (that costs the depth of every directory), use File.get_path.
+
+        :return: Iterator of (directory, its files).
+        """
+        stack = [self]
+        while stack:
+            directory = stack.pop()
+            files = directory.get_files()
+            yield directory, files
+            stack.extend(file for file in reversed(files) if isinstance(file, Directory))
+
+    def glob(self, pattern: str) -> Iterator[POSSIBLE_FILE_TYPE]:
+        """ Returns the files whose paths (relative to the current directory) match the pattern. Every part of the
+        pattern is matched against one name, like at fnmatch ("*", "?", "[abc]"), and "**" matches any number of
+        directories. Uses a stack instead of recursion, so the tree's depth is not limited.
+
+        :param pattern: Pattern like "a/*/c*.txt" or "**/banana".
+        :return: Iterator of the matching files (use File.get_path for their paths).
+        """
+        parts = [part for part in pattern.split(self.PATH_SEPARATOR) if part not in ("", ".")]
+        if not parts:
+            return
+        stack = [(self, 0)]
+        visited = set()
+        while stack:
+            directory, part_index = stack.pop()
+            if (id(directory), part_index) in visited:
+                continue
+            visited.add((id(directory), part_index))
+            part = parts[part_index]
+            files = directory.get_files()
+            if part == "**":
+                if part_index + 1 == len(parts):
+                    yield from files
+                else:
+                    stack.append((directory, part_index + 1))
+                stack.extend((file, part_index) for file in reversed(files) if isinstance(file, Directory))
+                continue
+            for file in reversed(files):
+                if not fnmatchcase(file.get_name(), part):
+                    continue
+                if part_index + 1 == len(parts):
+                    yield file
+                elif isinstance(file, Directory):
+                    stack.append((file, part_index + 1))
+
+
+_SNAPSHOT_MAGIC = b"HIERSNP1"
+# magic, offset of the users' table.
+_SNAPSHOT_HEADER = struct.Struct("<8sQ")
+# kind, name's length.
+_SNAPSHOT_NODE = struct.Struct("<BI")
+# directory: number of files.
+_SNAPSHOT_DIRECTORY = struct.Struct("<I")
+# file: creator's index, content's kind, content's size.
+_SNAPSHOT_FILE = struct.Struct("<IBQ")
+# user: kind, name's length, password's length.
+_SNAPSHOT_USER = struct.Struct("<BII")
+_SNAPSHOT_NO_CREATOR = 0xFFFFFFFF
+_DIRECTORY_KIND, _TEXTUAL_KIND, _BINARY_KIND = 0, 1, 2
+_TEXT_CONTENT, _BYTES_CONTENT = 0, 1
+_REGULAR_USER_KIND, _ADMINISTRATOR_KIND = 0, 1
+
+
+def save_snapshot(directory: Directory, path: str) -> None:
+    """ Write the directory and everything under it into a binary snapshot file, at one pass.
+
+    The files are written in pre-order (directory, then its files). Every file's content is written right after
+    it, and every creator is written once at the users' table (at the end of the snapshot), the files keep only
+    its index.
+
+    :param directory: The top directory.
+    :param path: The snapshot file's path.
+    :return: None.
+    """
+    users = {}
+    with open(path, "wb") as snapshot:
+        snapshot.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, 0))
+        stack = [directory]
+        while stack:
+            file = stack.pop()
+            name = file.get_name().encode("utf-8")
+            if isinstance(file, Directory):
+                files = file.get_files()
+                snapshot.write(_SNAPSHOT_NODE.pack(_DIRECTORY_KIND, len(name)) + name +
+                               _SNAPSHOT_DIRECTORY.pack(len(files)))
+                stack.extend(reversed(files))
+                continue
+
+            kind = _TEXTUAL_KIND if isinstance(file, TextualFile) else _BINARY_KIND
+            creator = _SNAPSHOT_NO_CREATOR if file._creator is None else users.setdefault(file._creator, len(users))
+            snapshot.write(_SNAPSHOT_NODE.pack(kind, len(name)) + name)
+            if isinstance(file._content, Content) and file._content.text_encoding not in (None, "utf-8"):
+                # Text of another encoding is written as UTF-8, so its size is known only after writing it.
+                size_offset = snapshot.tell()
+                snapshot.write(_SNAPSHOT_FILE.pack(creator, _TEXT_CONTENT, 0))
+                decoder = codecs.getincrementaldecoder(file._content.text_encoding)()
+                for chunk in file._content.read_chunks():
+                    snapshot.write(decoder.decode(chunk).encode("utf-8"))
+                snapshot.write(decoder.decode(b"", final=True).encode("utf-8"))
+                end_offset = snapshot.tell()
+                snapshot.seek(size_offset)
+                snapshot.write(_SNAPSHOT_FILE.pack(creator, _TEXT_CONTENT,
+                                                   end_offset - size_offset - _SNAPSHOT_FILE.size))
+                snapshot.seek(end_offset)
+            elif isinstance(file._content, Content):
+                content_kind = _BYTES_CONTENT if file._content.text_encoding is None else _TEXT_CONTENT
+                snapshot.write(_SNAPSHOT_FILE.pack(creator, content_kind, file._content.get_size()))
+                for chunk in file._content.read_chunks():
+                    snapshot.write(chunk)
+            else:
+                content = file._content.encode("utf-8")
+                snapshot.write(_SNAPSHOT_FILE.pack(creator, _TEXT_CONTENT, len(content)) + content)
+
+        users_offset = snapshot.tell()
+        for user in users:
+            user_name, password = user.user_name.encode("utf-8"), str(user.password).encode("utf-8")
+            kind = _ADMINISTRATOR_KIND if isinstance(user, SystemAdministratorUser) else _REGULAR_USER_KIND
+            snapshot.write(_SNAPSHOT_USER.pack(kind, len(user_name), len(password)) + user_name + password)
+        snapshot.seek(0)
+        snapshot.write(_SNAPSHOT_HEADER.pack(_SNAPSHOT_MAGIC, users_offset))
+
+
+def load_snapshot(path: str, lazy: bool = True) -> Directory:
+    """ Load directory from snapshot file that save_snapshot wrote. The file is mapped into memory and read at
+    once. Every creator becomes one user object that all of its files share.
+
+    :param path: The snapshot file's path.
+    :param lazy: Optional, True to leave the files' contents at the snapshot file until they are read (the
+                 snapshot file should not change then), False to load them now.
+    :return: The top directory.
+    :raises: ValueError if the file is not a snapshot.
+    """
+    with open(path, "rb") as snapshot, mmap.mmap(snapshot.fileno(), 0, access=mmap.ACCESS_READ) as data:
+        magic, users_offset = _SNAPSHOT_HEADER.unpack_from(data, 0)
+        if magic != _SNAPSHOT_MAGIC:
+            raise ValueError(f"{path} is not a hierarchy snapshot.")
+
+        users, offset = [], users_offset
+        while offset < len(data):
+            kind, name_length, password_length = _SNAPSHOT_USER.unpack_from(data, offset)
+            offset += _SNAPSHOT_USER.size
+            user_name = data[offset:offset + name_length].decode("utf-8")
+            password = data[offset + name_length:offset + name_length + password_length].decode("utf-8")
+            offset += name_length + password_length
+            user_type = SystemAdministratorUser if kind == _ADMINISTRATOR_KIND else RegularUser
+            users.append(user_type(user_name=user_name, password=password))
+
+        top_directory = None
+        # Directories whose files are still being read: [directory, number of files left].
+        open_directories = []
+        offset = _SNAPSHOT_HEADER.size
+        while offset < users_offset:
+            kind, name_length = _SNAPSHOT_NODE.unpack_from(data, offset)
+            offset += _SNAPSHOT_NODE.size
+            name = data[offset:offset + name_length].decode("utf-8")
+            offset += name_length
+            if kind == _DIRECTORY_KIND:
+                files_left, = _SNAPSHOT_DIRECTORY.unpack_from(data, offset)
+                offset += _SNAPSHOT_DIRECTORY.size
+                file = Directory(name)
+            else:
+                creator, content_kind, size = _SNAPSHOT_FILE.unpack_from(data, offset)
+                offset += _SNAPSHOT_FILE.size
+                text_encoding = "utf-8" if content_kind == _TEXT_CONTENT else None
+                if lazy and size:
+                    content = MappedFileContent(path, offset, size, text_encoding)
+                elif text_encoding:
+                    content = data[offset:offset + size].decode(text_encoding)
+                else:
+                    content = BytesContent(data[offset:offset + size])
+                offset += size
+                file_type = TextualFile if kind == _TEXTUAL_KIND else BinaryFile
+                file = file_type(name, content, None if creator == _SNAPSHOT_NO_CREATOR else users[creator])
+                files_left = 0
+
+            if top_directory is None:
+                top_directory = file
+            if files_left:
+                open_directories.append([file, files_left])
+                continue
+            # A directory is put into its parent only when it is complete, so updating the totals stops there.
+            while open_directories:
+                open_directories[-1][0]._attach(file)
+                open_directories[-1][1] -= 1
+                if open_directories[-1][1]:
+                    break
+                file = open_directories.pop()[0]
+    return top_directory
+
+
+def benchmark_snapshot(number_of_nodes: int = 1000000, files_per_directory: int = 100) -> None:
+    """ Print how long it takes to save and load (lazy and not lazy) snapshot of a tree.
+
+    :param number_of_nodes: Number of files and directories at the tree.
+    :param files_per_directory: Number of textual files at every directory.
+    :return: None.
+    """
+    user = RegularUser(user_name="user1", password="123")
+    top_directory = Directory("top")
+    directory = top_directory
+    for i in range(number_of_nodes - 1):
+        if i % (files_per_directory + 1) == 0:
+            directory = Directory(f"directory{i}")
+            top_directory.add_file(directory)
+        else:
+            directory.add_file(TextualFile(f"file{i}", f"content of file {i}", user))
+
+    with tempfile.TemporaryDirectory() as snapshot_directory:
+        path = os.path.join(snapshot_directory, "snapshot")
+        start = time.perf_counter()
+        save_snapshot(top_directory, path)
+        print(f"save {number_of_nodes} nodes: {time.perf_counter() - start:.2f}s, {os.path.getsize(path)} bytes")
+        for lazy in (True, False):
+            start = time.perf_counter()
+            loaded = load_snapshot(path, lazy)
+            print(f"load {number_of_nodes} nodes (lazy={lazy}): {time.perf_counter() - start:.2f}s")
+            assert loaded.get_files_count() == top_directory.get_files_count()
 
 
 def main_hierarchy() -> None:
@@ -1,4 +1,18 @@
+import atexit
+import locale
+import mmap
+import os
+import queue
+import re
+import threading
+import time
+from array import array
+from collections import OrderedDict
 from datetime import datetime
+from typing import Iterable
+
+_LINE_BREAK = re.compile(rb"\n")
+_UNIVERSAL_LINE_BREAK = re.compile(rb"\r\n|\r|\n")
 
 
 class LogFileError(Exception):
@@ -6,53 +20,388 @@ class LogFileError(Exception):
     Created to note that the program should close.
 
     :ivar: error_message: The error message that caused to that error.
+    :ivar: path: The log file's path.
 
     :param: error_message: The error message as string.
+    :param: path: Optional, the log file's path.
 
     """
-    def __init__(self, error_message: str):
+    def __init__(self, error_message: str, path: str = "log.txt"):
         self.error_message = error_message
+        self.path = path
 
     def __str__(self):
-        return f"While trying to handle with log.txt file, there was an error:\n{self.error_message}.\n" +\
+        return f"While trying to handle with {self.path} file, there was an error:\n{self.error_message}.\n" +\
                "The program should exit now."
 
 
+class BufferedLogWriter:
+    """ A BufferedLogWriter class. Keeps the log file open and writes the records at a background thread, so
+    the callers don't wait for the file.
+
+    The records wait at a bounded queue (adding a record waits when it is full) and are written in batches:
+    after batch_size records, or after flush_interval seconds. Closing the writer writes all of the records
+    that wait.
+
+    :ivar path: Log file's path.
+    :ivar batch_size: How many records to collect before writing them.
+    :ivar flush_interval: Maximum seconds a record waits before it is written.
+    :ivar _records: The records that wait to be written.
+    :ivar _file: The open log file.
+    :ivar _error: Error the background thread got while writing, None if there wasn't.
+    :ivar _closed: True once close was called, no more records are added then.
+    :ivar _closed_lock: Guards _closed, so a record isn't added after the writer was told to close.
+    :ivar _thread: The background thread.
+
+    :param path: Log file's path.
+    :param max_queue_size: Optional, maximum records that wait to be written.
+    :param batch_size: Optional, how many records to collect before writing them.
+    :param flush_interval: Optional, maximum seconds a record waits before it is written.
+    :raises LogFileError: If the log file can't be opened.
+    """
+    _CLOSE = None
+
+    def __init__(self, path: str = "log.txt", max_queue_size: int = 10000, batch_size: int = 100,
+                 flush_interval: float = 0.5):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self._records = queue.Queue(max_queue_size)
+        self._error = None
+        self._closed = False
+        self._closed_lock = threading.Lock()
+        try:
+            self._file = open(path, "a")
+        except(OSError, FileNotFoundError) as current_error:
+            raise LogFileError(str(current_error), path)
+        self._thread = threading.Thread(target=self._write_records, name="log-writer", daemon=True)
+        self._thread.start()
+
+    def _write_records(self) -> None:
+        """ The background thread: collect records and write them in batches until the writer is closed.
+        :return: None.
+        """
+        batch, deadline, closing = [], None, False
+        while not closing:
+            try:
+                timeout = None if deadline is None else max(deadline - time.monotonic(), 0)
+                record = self._records.get(timeout=timeout)
+                if record is self._CLOSE:
+                    closing = True
+                else:
+                    batch.append(record)
+                    deadline = deadline or time.monotonic() + self.flush_interval
+            except queue.Empty:
+                pass
+            if batch and (closing or len(batch) >= self.batch_size or time.monotonic() >= deadline):
+                self._write_batch(batch)
+                for _ in batch:
+                    self._records.task_done()
+                batch, deadline = [], None
+            if closing:
+                self._records.task_done()
+
+    def _write_batch(self, batch: list[str]) -> None:
+        """ Write records into the file, and keep the error if there is one (any error, so the background
+        thread keeps running and the callers get the error instead of waiting for it).
+        :param batch: The records.
+        :return: None.
+        """
+        if self._error is None:
+            try:
+                self._file.write("".join(batch))
+                self._file.flush()
+            except Exception as current_error:
+                self._error = current_error
+
+    def _raise_error(self) -> None:
+        """ Raise the error the background thread got, if there is one.
+        :return: None.
+        :raises LogFileError: If writing into the log file failed.
+        """
+        if self._error is not None:
+            raise LogFileError(str(self._error), self.path)
+
+    def write(self, record: str) -> None:
+        """ Add record to the records that wait to be written.
+        :param record: The record's text.
+        :return: None.
+        :raises LogFileError: If writing into the log file failed, or the writer is closed.
+        """
+        self._raise_error()
+        with self._closed_lock:
+            if self._closed:
+                raise LogFileError(f"The log writer of {self.path} is closed", self.path)
+            self._records.put(record)
+
+    def flush(self) -> None:
+        """ Wait until all of the records that were added are written.
+        :return: None.
+        :raises LogFileError: If writing into the log file failed.
+        """
+        self._records.join()
+        self._raise_error()
+
+    def close(self) -> None:
+        """ Write all of the records that wait and close the file.
+        :return: None.
+        :raises LogFileError: If writing into the log file failed.
+        """
+        with self._closed_lock:
+            closing, self._closed = not self._closed, True
+            if closing:
+                self._records.put(self._CLOSE)
+        if closing:
+            self._thread.join()
+            try:
+                self._file.close()
+            except Exception as current_error:
+                self._error = self._error or current_error
+        self._raise_error()
+
+
+_log_writer = None
+_log_writer_lock = threading.Lock()
+
+
+def configure_log(path: str = "log.txt", **options) -> None:
+    """ Set the file get_line_in_file writes its errors into. The current log writer is closed (its records are
+    written first) once the new log file is open. If it can't be opened, the current log writer is kept.
+    :param path: Log file's path.
+    :param options: BufferedLogWriter's options (max_queue_size, batch_size, flush_interval).
+    :return: None.
+    :raises LogFileError: If the log file can't be opened, or writing into the current log file failed.
+    """
+    global _log_writer
+    with _log_writer_lock:
+        log_writer, _log_writer = _log_writer, BufferedLogWriter(path, **options)
+        if log_writer is not None:
+            log_writer.close()
+
+
+def _get_log_writer() -> BufferedLogWriter:
+    """ Returns the current log writer, creates the default one (log.txt) if there isn't.
+    :return: The log writer.
+    :raises LogFileError: If the log file can't be opened.
+    """
+    global _log_writer
+    with _log_writer_lock:
+        if _log_writer is None:
+            _log_writer = BufferedLogWriter()
+        return _log_writer
+
+
+@atexit.register
+def close_log() -> None:
+    """ Write all of the records that wait and close the log file (called automatically at exit).
+    :return: None.
+    :raises LogFileError: If writing into the log file failed.
+    """
+    global _log_writer
+    with _log_writer_lock:
+        log_writer, _log_writer = _log_writer, None
+    if log_writer is not None:
+        log_writer.close()
+
+
 def _write_to_log_file(error_message: str, file_path: str, line_number: int) -> None:
     """ Receives error message and the parameters send to get_line_in_file function and write the error into
-    file called log.txt with timestamp.
+    the log file (log.txt unless configure_log was called) with timestamp.
+    The record is written at the background, see BufferedLogWriter.
 
     :param error_message: The error message that raise while trying to return the line number at the wanted file.
     :param file_path: Path to file.
     :param line_number: Index to wanted line in file.
     :return: None.
+    :raises LogFileError: If the log file can't be opened, or writing into it failed.
     """
-    try:
-        with open("log.txt", "a") as error_file:
-            error_file.write(f"At {datetime.now()}, try to run function get_line_in_file with file_path = {file_path}"
-                             f" and line_number = {line_number}.\nThe error is: " + error_message + "\n")
-    except(OSError, FileNotFoundError) as current_error:
-        raise LogFileError(str(current_error))
+    _get_log_writer().write(f"At {datetime.now()}, try to run function get_line_in_file with file_path = "
+                            f"{file_path} and line_number = {line_number}.\nThe error is: " + error_message + "\n")
+
+
+class LineIndex:
+    """ A LineIndex class. Keeps where every line of a file starts, so a line can be read without reading the
+    whole file.
+
+    Line breaks are found like reading the file at text mode does ('\\r\\n', '\\r' and '\\n').
+
+    :ivar file_path: Path to file.
+    :ivar modification_time: File's modification time (nanoseconds) when the index was built.
+    :ivar size: File's size when the index was built.
+    :ivar line_starts: Offset of the start of every line, and the file's size at the end.
+
+    :param file_path: Path to file.
+    """
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        file_status = os.stat(file_path)
+        self.modification_time = file_status.st_mtime_ns
+        self.size = file_status.st_size
+        self.line_starts = array("q", [0])
+        if self.size:
+            with open(file_path, "rb") as indexed_file, \
+                    mmap.mmap(indexed_file.fileno(), 0, access=mmap.ACCESS_READ) as content:
+                line_break = _LINE_BREAK if content.find(b"\r") == -1 else _UNIVERSAL_LINE_BREAK
+                self.line_starts.extend(match.end() for match in line_break.finditer(content))
+        self.line_starts.append(self.size)
+
+    def __len__(self):
+        """ Return the number of lines (a file that ends with line break has empty last line). """
+        return len(self.line_starts) - 1
+
+    def is_up_to_date(self) -> bool:
+        """ Returns if the file didn't change since the index was built.
+        :return: True if the file's modification time and size are the same, otherwise false.
+        :raises OSError: If the file can't be accessed.
+        """
+        file_status = os.stat(self.file_path)
+        return file_status.st_mtime_ns == self.modification_time and file_status.st_size == self.size
+
+    def get_line(self, index: int) -> str:
+        """ Returns the wanted line, without its line break.
+        :param index: The line's index (starts at zero).
+        :return: The content of the line.
+        :raises IndexError: If there is no such line.
+        """
+        if not 0 <= index < len(self):
+            raise IndexError("list index out of range")
+        start, end = self.line_starts[index], self.line_starts[index + 1]
+        if start == end:
+            return ""
+        with open(self.file_path, "rb") as indexed_file, \
+                mmap.mmap(indexed_file.fileno(), 0, access=mmap.ACCESS_READ) as content:
+            line = content[start:end]
+        if line.endswith(b"\r\n"):
+            line = line[:-2]
+        elif line.endswith((b"\n", b"\r")):
+            line = line[:-1]
+        return line.decode(locale.getpreferredencoding(False))
+
+
+_MAX_CACHED_INDEXES = 128
+_line_indexes = OrderedDict()
+
+
+def _get_line_index(file_path: str) -> LineIndex:
+    """ Returns the line index of the file. The indexes of the last used files are cached, and built again
+    when the file's modification time or size changes.
+
+    :param file_path: Path to file.
+    :return: The file's line index.
+    :raises OSError: If the file can't be accessed.
+    """
+    key = os.path.abspath(file_path)
+    line_index = _line_indexes.get(key)
+    if line_index is None or not line_index.is_up_to_date():
+        line_index = LineIndex(file_path)
+        _line_indexes[key] = line_index
+    _line_indexes.move_to_end(key)
+    while len(_line_indexes) > _MAX_CACHED_INDEXES:
+        _line_indexes.popitem(last=False)
+    return line_index
 
 
 def get_line_in_file(file_path: str, line_number: int) -> str:
     """ Returns the wanted line's number from the wanted file.
+    The file's line index is cached, so only the wanted line is read.
     :param file_path: Path to file.
     :param line_number: The wanted line's number at file.
     :return: The content of the file at the wanted line.
     """
     try:
-        with open(file_path, "r") as find_in_file:
-            index = line_number - 1
-            if line_number <= 0:
-                raise ValueError("line_number should be integer and greater than zero")
-            return find_in_file.read().split("\n")[index]
+        line_index = _get_line_index(file_path)
+        index = line_number - 1
+        if line_number <= 0:
+            raise ValueError("line_number should be integer and greater than zero")
+        return line_index.get_line(index)
 
     except (OSError, FileNotFoundError, ValueError, TypeError, IndexError) as error:
         _write_to_log_file(str(error), file_path, line_number)
         return ""
 
 
+def _check_line_number(line_number: int) -> None:
+    """ Raises the same error get_line_in_file gets for illegal line number.
+    :param line_number: The wanted line's number at file.
+    :return: None.
+    :raises TypeError: If line_number is not an integer.
+    :raises ValueError: If line_number is not greater than zero.
+    """
+    line_number - 1  # Raises TypeError for non numbers, like get_line_in_file does.
+    if line_number <= 0:
+        raise ValueError("line_number should be integer and greater than zero")
+    if not isinstance(line_number, int):
+        raise TypeError(f"list indices must be integers or slices, not {type(line_number).__name__}")
+
+
+def _read_lines(file_path: str, line_numbers: set[int]) -> dict[int, str]:
+    """ Reads the file once, line after line, and stops after the largest wanted line.
+    :param file_path: Path to file.
+    :param line_numbers: Legal line numbers.
+    :return: Line number -> line's content, for the wanted lines that exist at the file.
+    :raises OSError: If the file can't be read.
+    :raises ValueError: If the file can't be decoded.
+    """
+    targets = iter(sorted(line_numbers))
+    target = next(targets, None)
+    found = {}
+    with open(file_path, "r") as find_in_file:
+        # Empty file, or a file that ends with line break, has empty last line (like at split("\n")).
+        last_line, number = "\n", 0
+        for number, last_line in enumerate(find_in_file, 1):
+            if target is None:
+                break
+            if number == target:
+                found[number] = last_line[:-1] if last_line.endswith("\n") else last_line
+                target = next(targets, None)
+        else:
+            if target == number + 1 and last_line.endswith("\n"):
+                found[target] = ""
+    return found
+
+
+def get_lines(file_path: str, line_numbers: Iterable[int]) -> list[str]:
+    """ Returns the wanted lines from the wanted file, same as calling get_line_in_file for each of them, but
+    the file is read once, and only until the largest wanted line.
+    :param file_path: Path to file.
+    :param line_numbers: The wanted lines' numbers at file.
+    :return: The content of the file at every wanted line (empty string for illegal / missing line).
+    """
+    line_numbers = list(line_numbers)
+    errors = {}
+    for position, line_number in enumerate(line_numbers):
+        try:
+            _check_line_number(line_number)
+        except (ValueError, TypeError) as error:
+            errors[position] = str(error)
+
+    found = {}
+    legal_numbers = {line_number for position, line_number in enumerate(line_numbers) if position not in errors}
+    if legal_numbers:
+        try:
+            found = _read_lines(file_path, legal_numbers)
+        except (OSError, FileNotFoundError, ValueError) as error:
+            errors.update((position, str(error)) for position in range(len(line_numbers)) if position not in errors)
+
+    lines = []
+    for position, line_number in enumerate(line_numbers):
+        if position not in errors and line_number not in found:
+            errors[position] = "list index out of range"
+        if position in errors:
+            _write_to_log_file(errors[position], file_path, line_number)
+        lines.append(found.get(line_number, "") if position not in errors else "")
+    return lines
+
+
+def get_lines_in_files(wanted_lines: dict[str, Iterable[int]]) -> dict[str, list[str]]:
+    """ Returns the wanted lines from many files, see get_lines.
+    :param wanted_lines: Path to file -> the wanted lines' numbers at that file.
+    :return: Path to file -> the content of the file at every wanted line.
+    """
+    return {file_path: get_lines(file_path, line_numbers) for file_path, line_numbers in wanted_lines.items()}
+
+
 def main_the_syndicate() -> None:
     """ Doing test on get_line_in_file function.
     :return: None.
@@ -0,0 +1,201 @@
+"""
+Benchmark suite for the hot paths of every exercise.
+
+Run all of the benchmarks and print the results:
+    python benchmarks.py
+Save the results as JSON, and compare a later run with them (slowdowns above the threshold are flagged and the
+exit code is 1):
+    python benchmarks.py --output baseline.json
+    python benchmarks.py --baseline baseline.json --threshold 0.2
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import timeit
+from collections.abc import Callable
+from typing import Union
+
+from exercises import load_exercise
+
+SIZES = {"small": (1000, 100), "medium": (10000, 1000), "large": (100000, 10000)}
+
+
+def post_office_benchmarks(size: int, work_directory: str) -> dict[str, Callable[[], object]]:
+    """ Returns the PostOffice benchmarks: send, read and search at a box with size messages. """
+    post_office_module = load_exercise("7.2/post_office.py")
+
+    def filled_post_office(**options) -> object:
+        post_office = post_office_module.PostOffice(["Shay", "Itzik"], **options)
+        for i in range(size):
+            post_office.send_message("Shay", "Itzik", f"Title {i}", f"Body number {i} word{i % 97}", i % 10 == 0)
+        return post_office
+
+    def send() -> None:
+        filled_post_office()
+
+    def read() -> None:
+        post_office = filled_post_office()
+        for _ in range(10):
+            post_office.read_inbox("Itzik", size // 10)
+        post_office.read_inbox("Itzik")
+
+    linear = filled_post_office()
+    indexed = filled_post_office(indexed=True)
+    return {
+        "post_office.send_message": send,
+        "post_office.read_inbox": read,
+        "post_office.search_inbox": lambda: linear.search_inbox("Itzik", "word42"),
+        "post_office.search_inbox[indexed]": lambda: indexed.search_inbox("Itzik", "word42"),
+    }
+
+
+def group_by_benchmarks(size: int, work_directory: str) -> dict[str, Callable[[], object]]:
+    """ Returns the group_by benchmarks over size strings. """
+    group_by_module = load_exercise("6.5/group_by.py")
+    words = [f"word{i % 1000}" * (i % 7 + 1) for i in range(size)]
+    return {
+        "group_by": lambda: group_by_module.group_by(len, words),
+        "group_by[count]": lambda: group_by_module.group_by(len, words, group_by_module.COUNT),
+    }
+
+
+def find_terrorist_code_benchmarks(size: int, work_directory: str) -> dict[str, Callable[[], object]]:
+    """ Returns the find_terrorist_code benchmarks on image with size // 100 columns (skipped without Pillow). """
+    try:
+        remember_module = load_exercise("6.4/remember_remember.py")
+    except ImportError:
+        return {}
+    path = os.path.join(work_directory, f"code_{size}.png")
+    width = max(size // 100, 1)
+    code_image = remember_module.Image.new("L", (width, 256), 255)
+    for col in range(width):
+        code_image.putpixel((col, random.randrange(256)), 1)
+    code_image.save(path)
+    benchmarks = {"find_terrorist_code": lambda: remember_module.find_terrorist_code(path)}
+    if remember_module.np is not None:
+        benchmarks["find_terrorist_code[vectorized]"] = lambda: remember_module.find_terrorist_code_vectorized(path)
+    return benchmarks
+
+
+def get_line_in_file_benchmarks(size: int, work_directory: str) -> dict[str, Callable[[], object]]:
+    """ Returns the get_line_in_file benchmarks on file with size lines. """
+    syndicate_module = load_exercise("8.4/the_syndicate_function.py")
+    path = os.path.join(work_directory, f"lines_{size}.txt")
+    with open(path, "w") as lines_file:
+        lines_file.write("\n".join(f"line number {i}" for i in range(size)))
+    line_numbers = [random.randint(1, size) for _ in range(100)]
+    return {
+        "get_line_in_file": lambda: [syndicate_module.get_line_in_file(path, number) for number in line_numbers],
+        "get_lines": lambda: syndicate_module.get_lines(path, line_numbers),
+    }
+
+
+def directory_benchmarks(size: int, work_directory: str) -> dict[str, Callable[[], object]]:
+    """ Returns the Directory add/get/delete benchmarks with size files, and TextualFile.count on content with
+    size words (on new file, and again on file that already counted the string). """
+    hierarchy_module = load_exercise("8.1/hierarchy.py")
+    user = hierarchy_module.RegularUser(user_name="user1", password="123")
+    files = [hierarchy_module.TextualFile(f"file{i}", f"content {i}", user) for i in range(size)]
+    full_directory = hierarchy_module.Directory("full")
+    for file in files:
+        full_directory.add_file(file)
+    names = [file.get_name() for file in files]
+
+    def add_and_delete() -> None:
+        directory = hierarchy_module.Directory("directory")
+        for file in files:
+            directory.add_file(hierarchy_module.TextualFile(file.get_name(), "", user))
+        for name in names:
+            directory.delete_file(name)
+
+    content = " ".join(random.choice(["food", "Bar", "baz"]) for _ in range(size))
+    cached_file = hierarchy_module.TextualFile("big", content, user)
+    return {
+        "directory.add_file+delete_file": add_and_delete,
+        "directory.get_file": lambda: [full_directory.get_file(name) for name in names],
+        # A new file on every call, so the content is lowered and counted (TextualFile caches both).
+        "textual_file.count": lambda: hierarchy_module.TextualFile("big", content, user).count("food"),
+        "textual_file.count[cached]": lambda: cached_file.count("food"),
+    }
+
+
+BENCHMARK_GROUPS = {
+    "post_office": (post_office_benchmarks, 0),
+    "group_by": (group_by_benchmarks, 0),
+    "find_terrorist_code": (find_terrorist_code_benchmarks, 1),
+    "get_line_in_file": (get_line_in_file_benchmarks, 0),
+    "directory": (directory_benchmarks, 0),
+}
+
+
+def run_benchmarks(size_names: list[str], groups: list[str], repeat: int = 5) -> dict[str, dict[str, float]]:
+    """ Run the benchmarks and returns the best time of every one.
+    :param size_names: Names of the sizes to run (see SIZES).
+    :param groups: Names of the benchmark groups to run (see BENCHMARK_GROUPS).
+    :param repeat: How many times to run every benchmark (the best time is taken).
+    :return: Dictionary of "benchmark[size]" -> {"size": data size, "seconds": best time}.
+    """
+    random.seed(0)
+    results = {}
+    with tempfile.TemporaryDirectory() as work_directory:
+        for size_name in size_names:
+            for group in groups:
+                create_benchmarks, size_index = BENCHMARK_GROUPS[group]
+                size = SIZES[size_name][size_index]
+                for name, benchmark in create_benchmarks(size, work_directory).items():
+                    seconds = min(timeit.repeat(benchmark, number=1, repeat=repeat))
+                    results[f"{name}[{size_name}]"] = {"size": size, "seconds": seconds}
+                    print(f"{name}[{size_name}] (size {size}): {seconds * 1000:.3f}ms")
+    return results
+
+
+def compare_with_baseline(results: dict[str, dict[str, float]], baseline: dict[str, dict[str, float]],
+                          threshold: float) -> list[str]:
+    """ Returns the benchmarks that are slower than at the baseline by more than the threshold.
+    :param results: The current results.
+    :param baseline: Results of earlier run.
+    :param threshold: Allowed slowdown, 0.2 means 20% slower.
+    :return: Description of every slowdown.
+    """
+    slowdowns = []
+    for name, result in results.items():
+        if name in baseline and result["seconds"] > baseline[name]["seconds"] * (1 + threshold):
+            slowdowns.append(f"{name}: {baseline[name]['seconds'] * 1000:.3f}ms -> {result['seconds'] * 1000:.3f}ms "
+                             f"({result['seconds'] / baseline[name]['seconds']:.2f}x)")
+    return slowdowns
+
+
+def main_benchmarks(arguments: Union[list[str], None] = None) -> int:
+    """ Command line entry point, see the module's documentation.
+    :param arguments: Command line arguments (the default is sys.argv).
+    :return: Exit code: 1 if there are slowdowns, otherwise 0.
+    """
+    parser = argparse.ArgumentParser(description="Run the exercises' benchmarks.")
+    parser.add_argument("--sizes", nargs="+", choices=SIZES, default=["small", "medium"])
+    parser.add_argument("--groups", nargs="+", choices=BENCHMARK_GROUPS, default=list(BENCHMARK_GROUPS))
+    parser.add_argument("--repeat", type=int, default=5, help="Runs of every benchmark, the best is taken.")
+    parser.add_argument("--output", help="Write the results into that JSON file.")
+    parser.add_argument("--baseline", help="JSON file of earlier run to compare with.")
+    parser.add_argument("--threshold", type=float, default=0.2, help="Allowed slowdown (default: 0.2 = 20%%).")
+    parsed = parser.parse_args(arguments)
+
+    results = run_benchmarks(parsed.sizes, parsed.groups, parsed.repeat)
+    if parsed.output:
+        with open(parsed.output, "w") as output_file:
+            json.dump({"python": platform.python_version(), "machine": platform.machine(), "results": results},
+                      output_file, indent=2)
+
+    if parsed.baseline:
+        with open(parsed.baseline) as baseline_file:
+            slowdowns = compare_with_baseline(results, json.load(baseline_file)["results"], parsed.threshold)
+        print("\n".join(["Slowdowns:"] + slowdowns) if slowdowns else "No slowdowns.")
+        return 1 if slowdowns else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_benchmarks())
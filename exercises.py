@@ -0,0 +1,26 @@
+"""
+Loading the exercises' modules by their paths (the exercises' directories are not packages), for the scripts at
+the repository's directory.
+"""
+import importlib.util
+import os
+import sys
+
+ROOT_DIRECTORY = os.path.dirname(os.path.abspath(__file__))
+
+
+def load_exercise(relative_path: str):
+    """ Import exercise's module by its path (the exercises' directories are not packages).
+    :param relative_path: Path to the module, relative to the repository's directory.
+    :return: The module.
+    """
+    path = os.path.join(ROOT_DIRECTORY, relative_path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    if name in sys.modules:
+        return sys.modules[name]
+    sys.path.insert(0, os.path.dirname(path))
+    specification = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(specification)
+    sys.modules[name] = module
+    specification.loader.exec_module(module)
+    return module
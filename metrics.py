@@ -0,0 +1,273 @@
+"""
+Opt-in profiling of the exercises' hot paths: call counters, latency histograms and sizes of inboxes and
+directories.
+
+Nothing is measured until instrumentation is enabled. Enabling replaces the measured functions with wrappers,
+and disabling puts the original functions back, so when it is disabled there is no cost at all:
+    instrumentation = Instrumentation()
+    instrumentation.enable()
+    ...
+    print(instrumentation.registry.export_json())
+    instrumentation.disable()
+"""
+import bisect
+import functools
+import json
+import threading
+import time
+import timeit
+from collections.abc import Callable
+from typing import Any, Union
+
+from exercises import load_exercise
+
+
+class Histogram:
+    """ A Histogram class. Counts values into buckets, and keeps their count, sum, minimum and maximum.
+
+    :ivar bounds: Upper bound of every bucket (the last bucket is for bigger values).
+    :ivar buckets: How many values got into every bucket.
+    :ivar count: Number of values.
+    :ivar total: Sum of the values.
+    :ivar minimum: The smallest value, None if there are no values.
+    :ivar maximum: The biggest value, None if there are no values.
+
+    :param bounds: Upper bound of every bucket, sorted.
+    """
+
+    def __init__(self, bounds: list[float]):
+        self.bounds = bounds
+        self.buckets = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.minimum = None
+        self.maximum = None
+
+    def add(self, value: float) -> None:
+        """ Count value.
+        :param value: The value.
+        :return: None.
+        """
+        self.buckets[bisect.bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+        self.minimum = value if self.minimum is None else min(self.minimum, value)
+        self.maximum = value if self.maximum is None else max(self.maximum, value)
+
+    def percentile(self, fraction: float) -> Union[float, None]:
+        """ Returns the upper bound of the bucket the wanted percentile is at.
+        :param fraction: The percentile as fraction (0.99 for p99).
+        :return: Upper bound of the bucket (the maximum for the last bucket), None if there are no values.
+        """
+        if not self.count:
+            return None
+        wanted, seen = fraction * self.count, 0
+        for bound, bucket_count in zip(self.bounds, self.buckets):
+            seen += bucket_count
+            if seen >= wanted:
+                return min(bound, self.maximum)
+        return self.maximum
+
+    def snapshot(self) -> dict[str, Any]:
+        """ Returns the histogram's details as dictionary. """
+        return {"count": self.count, "sum": self.total, "min": self.minimum, "max": self.maximum,
+                "mean": self.total / self.count if self.count else None,
+                "p50": self.percentile(0.5), "p90": self.percentile(0.9), "p99": self.percentile(0.99),
+                "buckets": dict(zip([str(bound) for bound in self.bounds] + ["inf"], self.buckets))}
+
+
+# Latency buckets from 1 microsecond to about 16 seconds, every bucket twice the previous one.
+LATENCY_BOUNDS = [1e-6 * 2 ** i for i in range(25)]
+# Size buckets from 1 to about 16 million, every bucket twice the previous one.
+SIZE_BOUNDS = [2 ** i for i in range(25)]
+
+
+class MetricsRegistry:
+    """ A MetricsRegistry class. Keeps counters, latency histograms and size histograms by name. Can be used
+    from many threads at once (the measured post offices may be concurrent ones).
+
+    :ivar counters: Name -> count.
+    :ivar latencies: Name -> Histogram of seconds.
+    :ivar sizes: Name -> Histogram of sizes.
+    :ivar _lock: Guards the metrics' updates.
+    """
+
+    def __init__(self):
+        self.counters = {}
+        self.latencies = {}
+        self.sizes = {}
+        self._lock = threading.Lock()
+
+    def increment(self, name: str, amount: int = 1) -> None:
+        """ Add amount to counter. """
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def record_latency(self, name: str, seconds: float) -> None:
+        """ Add call's duration to latency histogram. """
+        with self._lock:
+            if name not in self.latencies:
+                self.latencies[name] = Histogram(LATENCY_BOUNDS)
+            self.latencies[name].add(seconds)
+
+    def record_size(self, name: str, size: int) -> None:
+        """ Add size (of inbox, directory...) to size histogram. """
+        with self._lock:
+            if name not in self.sizes:
+                self.sizes[name] = Histogram(SIZE_BOUNDS)
+            self.sizes[name].add(size)
+
+    def snapshot(self) -> dict[str, Any]:
+        """ Returns all of the metrics as dictionary.
+        :return: {"counters": ..., "latencies": ..., "sizes": ...}.
+        """
+        with self._lock:
+            return {"counters": dict(self.counters),
+                    "latencies": {name: histogram.snapshot() for name, histogram in self.latencies.items()},
+                    "sizes": {name: histogram.snapshot() for name, histogram in self.sizes.items()}}
+
+    def export_json(self, path: str = None) -> str:
+        """ Returns the metrics' snapshot as JSON, and writes it into file if path is given.
+        :param path: Optional, file to write the JSON into.
+        :return: The JSON text.
+        """
+        text = json.dumps(self.snapshot(), indent=2)
+        if path is not None:
+            with open(path, "w") as metrics_file:
+                metrics_file.write(text)
+        return text
+
+    def reset(self) -> None:
+        """ Remove all of the metrics.
+        :return: None.
+        """
+        with self._lock:
+            self.counters.clear()
+            self.latencies.clear()
+            self.sizes.clear()
+
+
+def timed(registry: MetricsRegistry, name: str,
+          size_of: Callable[..., Union[int, None]] = None) -> Callable[[Callable], Callable]:
+    """ Decorator that counts the function's calls and records their latencies (and optionally a size).
+
+    :param registry: The registry to record into.
+    :param name: The metric's name.
+    :param size_of: Optional, function that receives the call's arguments and returns size to record after the
+                    call (None to record nothing).
+    :return: The decorator.
+    """
+    def decorator(function: Callable) -> Callable:
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                registry.record_latency(name, time.perf_counter() - start)
+                registry.increment(name)
+                if size_of is not None:
+                    size = size_of(*args, **kwargs)
+                    if size is not None:
+                        registry.record_size(name, size)
+        return wrapper
+    return decorator
+
+
+def _inbox_size(post_office, user_name: str, *args, **kwargs) -> Union[int, None]:
+    """ Returns the size of the box read_inbox / search_inbox used, None if there is no such box. """
+    box = post_office.boxes.get(user_name)
+    return None if box is None else len(box)
+
+
+def _recipient_inbox_size(post_office, sender: str, recipient: str, *args, **kwargs) -> Union[int, None]:
+    """ Returns the size of the box send_message used, None if there is no such box. """
+    return _inbox_size(post_office, recipient)
+
+
+def _directory_size(directory, *args, **kwargs) -> int:
+    """ Returns the number of files at the directory get_file looked in. """
+    return directory.get_number_of_entries()
+
+
+class Instrumentation:
+    """ An Instrumentation class. Wraps the measured functions when enabled, and puts the original ones back when
+    disabled.
+
+    Measured: PostOffice.send_message / read_inbox / search_inbox (with the box's size), Directory.get_file
+    (with the directory's size) and get_line_in_file.
+
+    :ivar registry: The registry the wrappers record into.
+    :ivar _originals: (owner, attribute's name, original function) of every wrapped function.
+    """
+
+    def __init__(self, registry: MetricsRegistry = None):
+        self.registry = registry or MetricsRegistry()
+        self._originals = []
+
+    def _targets(self) -> list[tuple[Any, str, str, Union[Callable, None]]]:
+        """ Returns (owner, attribute's name, metric's name, size function) of every measured function. """
+        post_office_module = load_exercise("7.2/post_office.py")
+        hierarchy_module = load_exercise("8.1/hierarchy.py")
+        syndicate_module = load_exercise("8.4/the_syndicate_function.py")
+        post_office = post_office_module.PostOffice
+        return [
+            (post_office, "send_message", "post_office.send_message", _recipient_inbox_size),
+            (post_office, "read_inbox", "post_office.read_inbox", _inbox_size),
+            (post_office, "search_inbox", "post_office.search_inbox", _inbox_size),
+            (hierarchy_module.Directory, "get_file", "directory.get_file", _directory_size),
+            (syndicate_module, "get_line_in_file", "get_line_in_file", None),
+        ]
+
+    def is_enabled(self) -> bool:
+        """ Returns if the measured functions are wrapped now. """
+        return bool(self._originals)
+
+    def enable(self) -> None:
+        """ Wrap the measured functions (does nothing if already enabled).
+        :return: None.
+        """
+        if self.is_enabled():
+            return
+        for owner, attribute, name, size_of in self._targets():
+            original = getattr(owner, attribute)
+            self._originals.append((owner, attribute, original))
+            setattr(owner, attribute, timed(self.registry, name, size_of)(original))
+
+    def disable(self) -> None:
+        """ Put the original functions back.
+        :return: None.
+        """
+        for owner, attribute, original in reversed(self._originals):
+            setattr(owner, attribute, original)
+        self._originals.clear()
+
+
+def benchmark_overhead(number_of_messages: int = 20000, repeat: int = 5) -> None:
+    """ Print how long sending messages takes when the instrumentation was never enabled, when it is enabled, and
+    after it was disabled.
+
+    :param number_of_messages: How many messages to send at every run.
+    :param repeat: How many runs (the best is taken).
+    :return: None.
+    """
+    post_office_module = load_exercise("7.2/post_office.py")
+    instrumentation = Instrumentation()
+
+    def send() -> None:
+        post_office = post_office_module.PostOffice(["Shay", "Itzik"])
+        for i in range(number_of_messages):
+            post_office.send_message("Shay", "Itzik", "Title", "Body")
+
+    timings = {"never enabled": min(timeit.repeat(send, number=1, repeat=repeat))}
+    instrumentation.enable()
+    timings["enabled"] = min(timeit.repeat(send, number=1, repeat=repeat))
+    instrumentation.disable()
+    timings["disabled"] = min(timeit.repeat(send, number=1, repeat=repeat))
+    for mode, seconds in timings.items():
+        print(f"{mode}: {seconds / number_of_messages * 1e6:.3f}us per send_message "
+              f"({seconds / timings['never enabled']:.2f}x)")
+
+
+if __name__ == "__main__":
+    benchmark_overhead()